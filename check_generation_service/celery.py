@@ -1,6 +1,8 @@
 import os
+from typing import Any
 
 from celery import Celery
+from kombu import Queue
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault(
@@ -17,3 +19,28 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
+
+# The kitchen checks are what the cooks wait on, so they have their own
+# queue, listed first: a worker consuming all the queues takes the kitchen
+# tasks first, & separate workers can be started per queue with `-Q`.
+app.conf.task_queues = (
+    Queue("kitchen"),
+    Queue("client"),
+    Queue(app.conf.task_default_queue),
+)
+
+
+def route_rendering(
+    name: str, args: tuple, kwargs: dict, options: dict, **extra: Any
+) -> dict | None:
+    """
+    The function routes the rendering of the checks to the queue
+    of their check type.
+    """
+    if name == "check_service.tasks.generate_pdf" and kwargs.get("check_type"):
+        return {"queue": kwargs["check_type"]}
+
+    return None
+
+
+app.conf.task_routes = (route_rendering,)
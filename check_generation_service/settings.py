@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.1/ref/settings/
 import os
 from pathlib import Path
 
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "check_service.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -141,10 +143,50 @@ MEDIA_URL = "/media/"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Cache configurations
+# Redis is used when `CACHE_URL` is set, for instance: redis://redis:6379/1
+
+CACHE_URL = os.getenv("CACHE_URL")
+
+CACHES = {
+    "default": {
+        "BACKEND": (
+            "django.core.cache.backends.redis.RedisCache"
+            if CACHE_URL
+            else "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": CACHE_URL or "",
+    }
+}
+
+# Printers are cached for `PRINTER_REGISTRY_TIMEOUT` seconds and memoized
+# in each process for `PRINTER_REGISTRY_LOCAL_TIMEOUT` seconds.
+PRINTER_REGISTRY_TIMEOUT = int(os.getenv("PRINTER_REGISTRY_TIMEOUT") or 3600)
+PRINTER_REGISTRY_LOCAL_TIMEOUT = float(
+    os.getenv("PRINTER_REGISTRY_LOCAL_TIMEOUT") or 5
+)
+
+# A check is locked in the cache for up to `CHECK_LOCK_TIMEOUT` seconds
+# & claimed in the database for as long plus the time its batch takes
+# to convert, so that the other & duplicate tasks skip it. The responses to
+# the requests with an `Idempotency-Key` header are replayed for
+# `CHECK_IDEMPOTENCY_TIMEOUT` seconds.
+CHECK_LOCK_TIMEOUT = int(os.getenv("CHECK_LOCK_TIMEOUT") or 60)
+CHECK_IDEMPOTENCY_TIMEOUT = int(
+    os.getenv("CHECK_IDEMPOTENCY_TIMEOUT") or 24 * 3600
+)
+
 # DRF configurations
 
+# The list endpoints return `API_PAGE_SIZE` items per page by default
+# & up to `API_MAX_PAGE_SIZE` items with the `page_size` query parameter.
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE") or 100)
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE") or 1000)
+
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_PAGINATION_CLASS": "check_service.pagination.IdCursorPagination",
+    "PAGE_SIZE": API_PAGE_SIZE,
 }
 
 SPECTACULAR_SETTINGS = {
@@ -161,3 +203,161 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND")
 CELERY_TIMEZONE = "Europe/Kyiv"
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60
+# The Redis broker takes the queues in the listed order & the messages
+# of the lowest priority number first. A worker reserves a single task
+# at a time, so that the prioritized tasks are not stuck behind it.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "queue_order_strategy": "priority",
+    "priority_steps": list(range(10)),
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# PDF rendering configurations
+
+CHECK_PDF_RENDERER = (
+    os.getenv("CHECK_PDF_RENDERER")
+    or "check_service.renderers.WkhtmltopdfRenderer"
+)
+WKHTMLTOPDF_CMD = os.getenv("WKHTMLTOPDF_CMD") or "wkhtmltopdf"
+# wkhtmltopdf converts a single page per run, so the pages of a batch
+# are converted by up to `CHECK_PDF_RENDER_PROCESSES` parallel processes.
+CHECK_PDF_RENDER_PROCESSES = int(os.getenv("CHECK_PDF_RENDER_PROCESSES") or 4)
+
+# In the batch mode, new checks are not rendered on creation, they are
+# collected by a periodic task every `CHECK_PDF_BATCH_INTERVAL` seconds.
+CHECK_PDF_BATCH_RENDERING = (
+    os.getenv("CHECK_PDF_BATCH_RENDERING", "").lower() == "true"
+)
+CHECK_PDF_BATCH_SIZE = int(os.getenv("CHECK_PDF_BATCH_SIZE") or 100)
+CHECK_PDF_BATCH_INTERVAL = float(os.getenv("CHECK_PDF_BATCH_INTERVAL") or 5)
+
+# A check is rendered for up to `CHECK_PDF_RENDER_TIMEOUT` seconds. A check
+# that fails to render is retried `CHECK_PDF_RETRY_DELAY` seconds later, with
+# the delay doubled after each failure, & is marked as failed after
+# `CHECK_PDF_RENDER_MAX_ATTEMPTS` attempts.
+CHECK_PDF_RENDER_TIMEOUT = float(os.getenv("CHECK_PDF_RENDER_TIMEOUT") or 30)
+CHECK_PDF_RENDER_MAX_ATTEMPTS = int(
+    os.getenv("CHECK_PDF_RENDER_MAX_ATTEMPTS") or 5
+)
+CHECK_PDF_RETRY_DELAY = int(os.getenv("CHECK_PDF_RETRY_DELAY") or 10)
+
+# The checks of a point beyond every `CHECK_PDF_POINT_SHARE` new checks
+# waiting to be rendered get a lower priority, & the batches take the
+# checks of the points in turns, so that a busy point does not hold up
+# the others.
+CHECK_PDF_POINT_SHARE = int(os.getenv("CHECK_PDF_POINT_SHARE") or 20)
+
+# With `CHECK_RENDER_OUTBOX`, the rendering jobs of new checks are written
+# to an outbox table in the transaction that creates the checks, & the
+# `relay_render_jobs` command publishes them to Celery, up to
+# `CHECK_OUTBOX_BATCH_SIZE` jobs at a time, looking for new ones every
+# `CHECK_OUTBOX_INTERVAL` seconds when the outbox is empty.
+CHECK_RENDER_OUTBOX = os.getenv("CHECK_RENDER_OUTBOX", "").lower() == "true"
+CHECK_OUTBOX_BATCH_SIZE = int(os.getenv("CHECK_OUTBOX_BATCH_SIZE") or 500)
+CHECK_OUTBOX_INTERVAL = float(os.getenv("CHECK_OUTBOX_INTERVAL") or 0.5)
+
+# With `CHECK_HTML_AT_INGESTION`, the html of new checks is rendered when
+# they are created & stored gzipped, so that the workers only convert it
+# to pdf. The checks of the html & ESC/POS printers are always rendered
+# at ingestion & never reach the workers.
+CHECK_HTML_AT_INGESTION = (
+    os.getenv("CHECK_HTML_AT_INGESTION", "").lower() == "true"
+)
+
+# The pdf files are stored in MEDIA_ROOT by default. Set `CHECK_PDF_STORAGE`
+# to `storages.backends.s3boto3.S3Boto3Storage` (requires `django-storages`
+# & `boto3`) to share them between the nodes through an S3-compatible
+# object storage, such as MinIO.
+CHECK_PDF_STORAGE = (
+    os.getenv("CHECK_PDF_STORAGE")
+    or "check_service.storage.PdfFileSystemStorage"
+)
+AWS_STORAGE_BUCKET_NAME = os.getenv("AWS_STORAGE_BUCKET_NAME")
+AWS_S3_ENDPOINT_URL = os.getenv("AWS_S3_ENDPOINT_URL")
+AWS_S3_ACCESS_KEY_ID = os.getenv("AWS_S3_ACCESS_KEY_ID")
+AWS_S3_SECRET_ACCESS_KEY = os.getenv("AWS_S3_SECRET_ACCESS_KEY")
+AWS_S3_REGION_NAME = os.getenv("AWS_S3_REGION_NAME")
+
+# Rendered pdf files are cached by the hash of their html page.
+# Set `CHECK_PDF_CACHE_MAX_SIZE` to 0 to disable the cache.
+CHECK_PDF_CACHE_DIR = MEDIA_ROOT / "pdf_cache"
+CHECK_PDF_CACHE_MAX_SIZE = int(
+    os.getenv("CHECK_PDF_CACHE_MAX_SIZE") or 512 * 1024 * 1024
+)
+
+# The maximum number of checks returned to a printer per poll.
+CHECK_PRINT_BATCH_SIZE = int(os.getenv("CHECK_PRINT_BATCH_SIZE") or 50)
+
+# Printers can wait for new checks with the `wait` query parameter,
+# for up to `CHECK_LONG_POLL_MAX_WAIT` seconds. A waiting printer holds
+# a worker thread of the server, so the wait is kept short. Rendered checks
+# are announced through Redis, otherwise the waiting printers poll
+# the database every `CHECK_LONG_POLL_INTERVAL` seconds.
+CHECK_LONG_POLL_MAX_WAIT = float(os.getenv("CHECK_LONG_POLL_MAX_WAIT") or 5)
+CHECK_LONG_POLL_INTERVAL = float(os.getenv("CHECK_LONG_POLL_INTERVAL") or 1)
+CHECK_NOTIFICATIONS_URL = os.getenv("CHECK_NOTIFICATIONS_URL") or os.getenv(
+    "CELERY_BROKER_URL"
+)
+
+# Set `CHECK_PDF_SENDFILE_HEADER` to `X-Accel-Redirect` (nginx) or
+# `X-Sendfile` (Apache) to let the web server send the pdf files. The header
+# holds `CHECK_PDF_SENDFILE_PREFIX` followed by the path inside MEDIA_ROOT,
+# or the absolute path of the file when there is no prefix.
+CHECK_PDF_SENDFILE_HEADER = os.getenv("CHECK_PDF_SENDFILE_HEADER")
+CHECK_PDF_SENDFILE_PREFIX = os.getenv("CHECK_PDF_SENDFILE_PREFIX")
+
+# Printed checks older than `CHECK_RETENTION_DAYS` days are archived every
+# day at `CHECK_RETENTION_HOUR` o'clock: their orders are moved to gzipped
+# JSON lines files in `CHECK_ARCHIVE_DIR` & their pdf files are deleted,
+# `CHECK_RETENTION_CHUNK_SIZE` checks per transaction. Set
+# `CHECK_RETENTION_DAYS` to 0 (default) to keep the checks forever.
+CHECK_RETENTION_DAYS = int(os.getenv("CHECK_RETENTION_DAYS") or 0)
+CHECK_RETENTION_HOUR = int(os.getenv("CHECK_RETENTION_HOUR") or 3)
+CHECK_RETENTION_CHUNK_SIZE = int(
+    os.getenv("CHECK_RETENTION_CHUNK_SIZE") or 1000
+)
+CHECK_ARCHIVE_DIR = Path(
+    os.getenv("CHECK_ARCHIVE_DIR") or BASE_DIR / "archive"
+)
+
+# On PostgreSQL, the check table can be partitioned by month of creation.
+# `CHECK_PARTITIONS_AHEAD` monthly partitions are created in advance every
+# day. With `CHECK_ACTIVE_DAYS`, rendering & printing look only at the checks
+# created in the last days, so that the older partitions are pruned.
+CHECK_PARTITIONED_TABLE = (
+    os.getenv("CHECK_PARTITIONED_TABLE", "").lower() == "true"
+)
+CHECK_PARTITIONS_AHEAD = int(os.getenv("CHECK_PARTITIONS_AHEAD") or 3)
+CHECK_ACTIVE_DAYS = int(os.getenv("CHECK_ACTIVE_DAYS") or 0)
+
+# Set `PROMETHEUS_MULTIPROC_DIR` to a directory shared by the web & Celery
+# worker processes of a host to expose the metrics of all of them.
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+
+CELERY_BEAT_SCHEDULE = {}
+
+if CHECK_PDF_BATCH_RENDERING:
+    CELERY_BEAT_SCHEDULE["generate-pending-pdfs"] = {
+        "task": "check_service.tasks.generate_pending_pdfs",
+        "schedule": CHECK_PDF_BATCH_INTERVAL,
+    }
+else:
+    # The checks whose rendering task was lost, or died with their claim,
+    # are swept up once they are `CHECK_LOCK_TIMEOUT` seconds old.
+    CELERY_BEAT_SCHEDULE["render-stale-checks"] = {
+        "task": "check_service.tasks.generate_pending_pdfs",
+        "schedule": CHECK_LOCK_TIMEOUT,
+        "kwargs": {"min_age": CHECK_LOCK_TIMEOUT},
+    }
+
+if CHECK_RETENTION_DAYS:
+    CELERY_BEAT_SCHEDULE["archive-printed-checks"] = {
+        "task": "check_service.tasks.archive_printed_checks",
+        "schedule": crontab(minute=0, hour=CHECK_RETENTION_HOUR),
+    }
+
+if CHECK_PARTITIONED_TABLE:
+    CELERY_BEAT_SCHEDULE["create-check-partitions"] = {
+        "task": "check_service.tasks.create_check_partitions",
+        "schedule": crontab(minute=30, hour=0),
+    }
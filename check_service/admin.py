@@ -1,14 +1,38 @@
 from django.contrib import admin
+from django.db.models import QuerySet
+from django.http import HttpRequest
 
 from check_service.models import Printer, Check
+from check_service.views import enqueue_rendering
 
 
 @admin.register(Printer)
 class PrinterAdmin(admin.ModelAdmin):
     search_fields = ("name",)
-    list_filter = ("name", "check_type")
+    list_filter = ("name", "check_type", "output_format")
 
 
 @admin.register(Check)
 class CheckAdmin(admin.ModelAdmin):
-    list_filter = ("printer_id", "check_type", "status")
+    list_filter = ("printer_id", "check_type", "status", "created_at")
+    readonly_fields = ("render_attempts", "render_error")
+    actions = ("render_again",)
+
+    @admin.action(description="Render the selected failed checks again")
+    def render_again(self, request: HttpRequest, queryset: QuerySet) -> None:
+        """
+        The method resets the render attempts of the failed checks
+        & schedules their rendering.
+        """
+        checks = list(
+            queryset.filter(status=Check.StatusChoices.FAILED).select_related(
+                "printer_id"
+            )
+        )
+        Check.objects.filter(id__in=[check.id for check in checks]).update(
+            status=Check.StatusChoices.NEW,
+            render_attempts=0,
+            render_error="",
+            render_after=None,
+        )
+        enqueue_rendering(checks)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CheckServiceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "check_service"
+
+    def ready(self) -> None:
+        """
+        The method connects the signal handlers of the application.
+        """
+        from check_service import signals  # noqa: F401
@@ -0,0 +1,352 @@
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Iterator
+
+from celery.signals import task_postrun
+from django.db import connection
+from rest_framework.test import APIRequestFactory
+
+from check_generation_service import celery_app, settings
+from check_service.models import (
+    CheckOrder,
+    CheckTypeChoices,
+    Printer,
+    Check,
+)
+from check_service.views import CheckViewSet
+
+FIXTURE = Path(__file__).parent / "fixtures" / "check_data.json"
+
+# Benchmark printers are placed far away from the real points, & benchmark
+# orders take ids far above the real ones that still fit the order id column.
+FIRST_POINT_ID = 10**9
+FIRST_ORDER_ID = 2 * 10**9
+
+
+def percentiles(values: list[float]) -> dict[str, float | int]:
+    """
+    The function returns the count, p50, p95, p99 & maximum of the values
+    in milliseconds.
+    """
+    if not values:
+        return {"count": 0}
+
+    if len(values) == 1:
+        p50 = p95 = p99 = values[0]
+    else:
+        quantiles = statistics.quantiles(values, n=100, method="inclusive")
+        p50, p95, p99 = quantiles[49], quantiles[94], quantiles[98]
+
+    return {
+        "count": len(values),
+        "p50": round(p50 * 1000, 3),
+        "p95": round(p95 * 1000, 3),
+        "p99": round(p99 * 1000, 3),
+        "max": round(max(values) * 1000, 3),
+    }
+
+
+def synthetic_orders(
+    count: int, point_ids: list[int], seed: int
+) -> list[dict]:
+    """
+    The function returns orders made of random dishes & clients of
+    the check fixtures, with the ids reserved for the benchmark.
+    """
+    fixtures = json.loads(FIXTURE.read_text())
+    orders = [
+        item["fields"]["order"]
+        for item in fixtures
+        if item["model"] == "check_service.check"
+    ]
+    dishes = {
+        dish["name"]: dish["price_one_dish"]
+        for order in orders
+        for dish in order["dishes"]
+    }
+    clients = sorted({order["client_name"] for order in orders})
+    generator = random.Random(seed)
+
+    synthetic = []
+    for order_id in range(FIRST_ORDER_ID + 1, FIRST_ORDER_ID + count + 1):
+        order_dishes = []
+        for name in generator.sample(
+            sorted(dishes), generator.randint(1, min(5, len(dishes)))
+        ):
+            amount = generator.randint(1, 3)
+            order_dishes.append(
+                {
+                    "name": name,
+                    "amount": amount,
+                    "price_one_dish": dishes[name],
+                    "total_price": round(amount * dishes[name], 2),
+                }
+            )
+
+        synthetic.append(
+            {
+                "order_id": order_id,
+                "client_name": generator.choice(clients),
+                "point_id": generator.choice(point_ids),
+                "dishes": order_dishes,
+            }
+        )
+
+    return synthetic
+
+
+@contextmanager
+def eager_tasks() -> Iterator[None]:
+    """
+    The function runs the Celery tasks in the calling thread.
+    """
+    conf = celery_app.conf
+    previous = conf.task_always_eager, conf.task_eager_propagates
+    conf.task_always_eager = conf.task_eager_propagates = True
+
+    try:
+        yield
+    finally:
+        conf.task_always_eager, conf.task_eager_propagates = previous
+
+
+class Benchmark:
+    """
+    The benchmark replays synthetic orders against `CheckViewSet.create`
+    while the printers of their points poll `print_checks`, & measures
+    every stage of the way from an order to a printed check.
+    """
+
+    def __init__(
+        self,
+        orders: int,
+        points: int,
+        concurrency: int,
+        eager: bool,
+        poll_wait: float,
+        timeout: float,
+        seed: int,
+    ) -> None:
+        self.orders = orders
+        self.points = points
+        self.concurrency = concurrency
+        self.eager = eager
+        self.poll_wait = poll_wait
+        self.timeout = timeout
+        self.seed = seed
+
+        self.factory = APIRequestFactory()
+        host = settings.ALLOWED_HOSTS[0].lstrip(".")
+        self.host = "localhost" if host in ("", "*") else host
+        self.create_view = CheckViewSet.as_view({"post": "create"})
+        self.print_view = CheckViewSet.as_view({"get": "print_checks"})
+
+        self._lock = threading.Lock()
+        self.sent_at: dict[int, float] = {}
+        self.create_latencies: list[float] = []
+        self.poll_latencies: list[float] = []
+        self.print_latencies: list[float] = []
+        self.render_stats = {
+            "tasks": 0,
+            "checks": 0,
+            "template_seconds": 0.0,
+            "pdf_seconds": 0.0,
+        }
+        self.errors = 0
+        self.empty_polls = 0
+        self.printed = 0
+        self.expected = 0
+
+    def _record_render(self, sender: Any = None, **kwargs: Any) -> None:
+        if sender.name != "check_service.tasks.generate_pdf":
+            return
+
+        retval = kwargs.get("retval")
+        if not isinstance(retval, dict):
+            return
+
+        with self._lock:
+            self.render_stats["tasks"] += 1
+            for key in ("checks", "template_seconds", "pdf_seconds"):
+                self.render_stats[key] += retval.get(key, 0)
+
+    def create_order(self, order: dict) -> None:
+        request = self.factory.post(
+            "/api/checks/",
+            {"order": order},
+            format="json",
+            HTTP_HOST=self.host,
+        )
+        started_at = time.perf_counter()
+
+        with self._lock:
+            self.sent_at[order["order_id"]] = started_at
+
+        # Every request gets a new connection, like with CONN_MAX_AGE = 0.
+        try:
+            response = self.create_view(request)
+            latency = time.perf_counter() - started_at
+        finally:
+            connection.close()
+
+        with self._lock:
+            self.create_latencies.append(latency)
+            if response.status_code != 201:
+                self.errors += 1
+
+    def poll_printer(self, printer: Printer, deadline: float) -> None:
+        while time.monotonic() < deadline:
+            with self._lock:
+                if self.printed >= self.expected:
+                    return
+
+            request = self.factory.get(
+                f"/api/checks/print-checks/{printer.api_key}/",
+                {"wait": self.poll_wait},
+                HTTP_HOST=self.host,
+            )
+            started_at = time.perf_counter()
+            try:
+                response = self.print_view(request, api_key=printer.api_key)
+                printed_at = time.perf_counter()
+            finally:
+                connection.close()
+
+            with self._lock:
+                self.poll_latencies.append(printed_at - started_at)
+                if response.status_code != 200:
+                    self.empty_polls += 1
+                    continue
+
+                for check in response.data:
+                    self.printed += 1
+                    sent_at = self.sent_at.get(check["order_id"])
+                    if sent_at is not None:
+                        self.print_latencies.append(printed_at - sent_at)
+
+    def create_printers(self) -> list[Printer]:
+        printers = [
+            Printer(
+                name=f"Benchmark {check_type} printer {point}",
+                api_key=f"benchmark-{self.seed}-{point}-{check_type}",
+                check_type=check_type,
+                point_id=FIRST_POINT_ID + point,
+            )
+            for point in range(self.points)
+            for check_type in CheckTypeChoices.values
+        ]
+        # Saved one by one, so that the printer registry is invalidated.
+        for printer in printers:
+            printer.save()
+
+        return printers
+
+    def delete_printers(
+        self, printers: list[Printer], orders: list[dict]
+    ) -> None:
+        storage = Check._meta.get_field("pdf_file").storage
+        checks = Check.objects.filter(printer_id__in=printers).exclude(
+            pdf_file=""
+        )
+        for name in set(checks.values_list("pdf_file", flat=True)):
+            storage.delete(name)
+
+        for printer in printers:
+            printer.delete()
+
+        # The order ids are freed for the next run.
+        CheckOrder.objects.filter(
+            order_id__in=[order["order_id"] for order in orders]
+        ).delete()
+
+    def run(self) -> dict[str, Any]:
+        """
+        The method runs the benchmark & returns its report.
+        """
+        printers = self.create_printers()
+        point_ids = sorted({printer.point_id for printer in printers})
+        orders = synthetic_orders(self.orders, point_ids, self.seed)
+        self.expected = len(orders) * len(CheckTypeChoices.values)
+
+        task_postrun.connect(self._record_render)
+        try:
+            with eager_tasks() if self.eager else nullcontext():
+                started_at = time.perf_counter()
+                deadline = time.monotonic() + self.timeout
+
+                pollers = [
+                    threading.Thread(
+                        target=self.poll_printer, args=(printer, deadline)
+                    )
+                    for printer in printers
+                ]
+                for poller in pollers:
+                    poller.start()
+
+                with ThreadPoolExecutor(self.concurrency) as pool:
+                    list(pool.map(self.create_order, orders))
+                created_at = time.perf_counter()
+
+                for poller in pollers:
+                    poller.join()
+                finished_at = time.perf_counter()
+        finally:
+            task_postrun.disconnect(self._record_render)
+            self.delete_printers(printers, orders)
+
+        return self.report(created_at - started_at, finished_at - started_at)
+
+    def report(
+        self, create_seconds: float, total_seconds: float
+    ) -> dict[str, Any]:
+        checks = self.render_stats["checks"]
+
+        return {
+            "mode": "eager" if self.eager else "workers",
+            "orders": self.orders,
+            "points": self.points,
+            "concurrency": self.concurrency,
+            "seed": self.seed,
+            "seconds": round(total_seconds, 3),
+            "throughput": {
+                "orders_per_second": round(self.orders / create_seconds, 3),
+                "checks_printed_per_second": round(
+                    self.printed / total_seconds, 3
+                ),
+            },
+            "latency_ms": {
+                "create": percentiles(self.create_latencies),
+                "poll": percentiles(self.poll_latencies),
+                "order_to_print": percentiles(self.print_latencies),
+            },
+            "render": {
+                "tasks": self.render_stats["tasks"],
+                "checks": checks,
+                "template_seconds": round(
+                    self.render_stats["template_seconds"], 3
+                ),
+                "pdf_seconds": round(self.render_stats["pdf_seconds"], 3),
+                "template_ms_per_check": round(
+                    self.render_stats["template_seconds"] * 1000 / checks, 3
+                )
+                if checks
+                else None,
+                "pdf_ms_per_check": round(
+                    self.render_stats["pdf_seconds"] * 1000 / checks, 3
+                )
+                if checks
+                else None,
+            },
+            "polls": {
+                "empty": self.empty_polls,
+                "non_empty": len(self.poll_latencies) - self.empty_polls,
+            },
+            "errors": self.errors,
+            "checks": {"expected": self.expected, "printed": self.printed},
+        }
@@ -0,0 +1,238 @@
+import hashlib
+import json
+from functools import wraps
+from typing import Any, Callable
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache, caches
+from django.core.cache.backends.redis import RedisCache
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from check_generation_service import settings
+
+RENDER_LOCK_KEY = "check_service:render-lock:{}"
+IDEMPOTENCY_KEY = "check_service:idempotency:{}"
+
+
+# The script deletes only the locks that still hold the token of the task,
+# so that a task whose locks expired does not release the locks taken
+# by another task since.
+RELEASE_LOCKS_SCRIPT = """
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call("get", key) == ARGV[1] then
+        released = released + redis.call("del", key)
+    end
+end
+return released
+"""
+
+
+def acquire_render_locks(check_ids: list[int], token: str) -> list[int]:
+    """
+    The function locks the checks for rendering with the token of the task
+    for `CHECK_LOCK_TIMEOUT` seconds & returns the ids of the checks that
+    were not locked yet. With Redis, the locks are taken in a single
+    round trip.
+    """
+    backend = caches["default"]
+    keys = [RENDER_LOCK_KEY.format(check_id) for check_id in check_ids]
+
+    if isinstance(backend, RedisCache):
+        client = backend._cache.get_client(write=True)
+        with client.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.set(
+                    backend.make_and_validate_key(key),
+                    token,
+                    nx=True,
+                    ex=settings.CHECK_LOCK_TIMEOUT,
+                )
+            results = pipeline.execute()
+    else:
+        results = [
+            backend.add(key, token, settings.CHECK_LOCK_TIMEOUT)
+            for key in keys
+        ]
+
+    return [check_id for check_id, locked in zip(check_ids, results) if locked]
+
+
+def release_render_locks(check_ids: list[int], token: str) -> None:
+    """
+    The function releases the locks of the checks
+    that are still held with the token of the task.
+    """
+    backend = caches["default"]
+    keys = [RENDER_LOCK_KEY.format(check_id) for check_id in check_ids]
+
+    if isinstance(backend, RedisCache):
+        client = backend._cache.get_client(write=True)
+        client.eval(
+            RELEASE_LOCKS_SCRIPT,
+            len(keys),
+            *[backend.make_and_validate_key(key) for key in keys],
+            token,
+        )
+        return
+
+    held = backend.get_many(keys)
+    backend.delete_many([key for key in keys if held.get(key) == token])
+
+
+def request_fingerprint(request: HttpRequest | Request) -> str:
+    """
+    The function returns the hash of the method, path & body
+    of the request.
+    """
+    digest = hashlib.sha256()
+    for part in (request.method, request.get_full_path()):
+        digest.update(part.encode() + b"\n")
+    digest.update(request.body)
+
+    return digest.hexdigest()
+
+
+def idempotency_key(request: HttpRequest | Request) -> str | None:
+    """
+    The function returns the cache key of the `Idempotency-Key` header
+    of the request, if any.
+    """
+    key = request.headers.get("Idempotency-Key")
+    if not key:
+        return None
+
+    return IDEMPOTENCY_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def reserve_idempotency_key(
+    cache_key: str, fingerprint: str
+) -> tuple[int, dict, dict] | None:
+    """
+    The function takes the key for the request & returns `None`, or the
+    status, data & headers of the response to give instead: the replayed
+    response of the first request, or the error of a request in progress
+    or of a key reused for a different request.
+    """
+    # The key is taken before the request is handled, so that
+    # a concurrent retry does not create the checks twice.
+    if cache.add(
+        cache_key,
+        {"status": None, "fingerprint": fingerprint},
+        settings.CHECK_LOCK_TIMEOUT,
+    ):
+        return None
+
+    saved = cache.get(cache_key)
+    if saved is not None and saved["fingerprint"] != fingerprint:
+        return (
+            status.HTTP_422_UNPROCESSABLE_ENTITY,
+            {
+                "message": "The idempotency key was used for a different request."
+            },
+            {},
+        )
+
+    if saved is None or saved["status"] is None:
+        return (
+            status.HTTP_409_CONFLICT,
+            {"message": "A request with this idempotency key is in progress."},
+            {},
+        )
+
+    return saved["status"], saved["data"], {"Idempotent-Replayed": "true"}
+
+
+def save_idempotent_response(
+    cache_key: str, fingerprint: str, status_code: int, data: Any
+) -> None:
+    """
+    The function keeps a successful response for the replays during
+    `CHECK_IDEMPOTENCY_TIMEOUT` seconds & frees the key otherwise.
+    """
+    if status.is_success(status_code):
+        cache.set(
+            cache_key,
+            {"status": status_code, "data": data, "fingerprint": fingerprint},
+            settings.CHECK_IDEMPOTENCY_TIMEOUT,
+        )
+    else:
+        cache.delete(cache_key)
+
+
+def idempotent(method: Callable) -> Callable:
+    """
+    The decorator replays the response of a successful request to a view
+    method for the requests with the same `Idempotency-Key` header during
+    `CHECK_IDEMPOTENCY_TIMEOUT` seconds, without calling the method.
+    A key reused for a different request is rejected.
+    """
+
+    @wraps(method)
+    def wrapper(
+        self: Any, request: Request, *args: Any, **kwargs: Any
+    ) -> Response:
+        cache_key = idempotency_key(request)
+        if cache_key is None:
+            return method(self, request, *args, **kwargs)
+
+        fingerprint = request_fingerprint(request)
+        if reply := reserve_idempotency_key(cache_key, fingerprint):
+            status_code, data, headers = reply
+            return Response(data, status=status_code, headers=headers)
+
+        try:
+            response = method(self, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        save_idempotent_response(
+            cache_key, fingerprint, response.status_code, response.data
+        )
+
+        return response
+
+    return wrapper
+
+
+def aidempotent(view: Callable) -> Callable:
+    """
+    The decorator is the version of `idempotent` for the async views
+    that return a `JsonResponse`.
+    """
+
+    @wraps(view)
+    async def wrapper(
+        request: HttpRequest, *args: Any, **kwargs: Any
+    ) -> HttpResponse:
+        cache_key = idempotency_key(request)
+        if cache_key is None:
+            return await view(request, *args, **kwargs)
+
+        fingerprint = request_fingerprint(request)
+        if reply := await sync_to_async(reserve_idempotency_key)(
+            cache_key, fingerprint
+        ):
+            status_code, data, headers = reply
+            return JsonResponse(data, status=status_code, headers=headers)
+
+        try:
+            response = await view(request, *args, **kwargs)
+        except Exception:
+            await cache.adelete(cache_key)
+            raise
+
+        await sync_to_async(save_idempotent_response)(
+            cache_key,
+            fingerprint,
+            response.status_code,
+            json.loads(response.content),
+        )
+
+        return response
+
+    return wrapper
@@ -0,0 +1,83 @@
+import gzip
+from functools import lru_cache
+
+from django.template.backends.django import Template
+from django.template.loader import get_template
+
+from check_generation_service import settings
+from check_service.models import OutputFormatChoices, Check
+
+# ESC/POS commands: initialize the printer; feed 3 lines & cut the paper.
+ESCPOS_INIT = b"\x1b@"
+ESCPOS_CUT = b"\x1dVA\x03"
+
+CONTENT_TYPES = {
+    OutputFormatChoices.HTML: "text/html; charset=utf-8",
+    OutputFormatChoices.ESCPOS: "application/octet-stream",
+}
+EXTENSIONS = {
+    OutputFormatChoices.HTML: "html",
+    OutputFormatChoices.ESCPOS: "bin",
+}
+
+
+@lru_cache(maxsize=None)
+def get_check_template(name: str = "check.html") -> Template:
+    """
+    The function loads & compiles a check template once per process.
+    """
+    return get_template(name)
+
+
+def render_html(check: Check) -> str:
+    if check.total_amount_due is None:
+        # The check was created before the totals were precomputed.
+        check.populate_from_order()
+
+    return get_check_template().render({"check": check})
+
+
+def render_escpos(check: Check) -> bytes:
+    """
+    The function renders the check as a plain text receipt
+    wrapped in ESC/POS commands, in the code page 437 of the printers.
+    """
+    text = get_check_template("check.txt").render({"check": check})
+    return ESCPOS_INIT + text.encode("cp437", errors="replace") + ESCPOS_CUT
+
+
+def compress(document: bytes) -> bytes:
+    # Without a timestamp, the same document is always compressed
+    # to the same bytes, which makes their hash a stable ETag.
+    return gzip.compress(document, mtime=0)
+
+
+def decompress(document_gz: bytes | memoryview) -> bytes:
+    return gzip.decompress(document_gz)
+
+
+def render_ahead(checks: list[Check]) -> None:
+    """
+    The function renders the documents of the new checks
+    before they are saved.
+
+    The checks of html & ESC/POS printers get their final document & are
+    marked as rendered. The checks of pdf printers get their html page
+    when `CHECK_HTML_AT_INGESTION` is set, so that the workers only
+    convert it.
+    """
+    for check in checks:
+        output_format = check.printer_id.output_format
+
+        if output_format == OutputFormatChoices.PDF:
+            if settings.CHECK_HTML_AT_INGESTION:
+                check.document_gz = compress(render_html(check).encode())
+            continue
+
+        if output_format == OutputFormatChoices.ESCPOS:
+            document = render_escpos(check)
+        else:
+            document = render_html(check).encode()
+
+        check.document_gz = compress(document)
+        check.status = Check.StatusChoices.RENDERED
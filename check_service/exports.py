@@ -0,0 +1,69 @@
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from check_service.models import Check
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ZipStream:
+    """
+    The write-only file object that buffers the written bytes until they are
+    taken away. `ZipFile` can not seek in it, so it writes every entry with
+    a data descriptor & never goes back to the written bytes.
+    """
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+        self.position = 0
+
+    def write(self, data: bytes) -> int:
+        self.buffer += data
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        return data
+
+
+def zip_checks(checks: Iterable[Check]) -> Iterator[bytes]:
+    """
+    The function yields a ZIP archive with the pdf files of the checks,
+    grouped by printer, reading one chunk of a file at a time
+    from the storage.
+    """
+    stream = ZipStream()
+
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_STORED) as archive:
+        for check in checks:
+            pdf_file = check.pdf_file
+            if not pdf_file or not pdf_file.storage.exists(pdf_file.name):
+                continue
+
+            modified_time = pdf_file.storage.get_modified_time(pdf_file.name)
+            info = zipfile.ZipInfo(
+                f"{check.printer_id_id}/{Path(pdf_file.name).name}",
+                date_time=modified_time.timetuple()[:6],
+            )
+            info.external_attr = 0o644 << 16
+            info.file_size = pdf_file.size
+
+            with archive.open(info, "w") as entry, pdf_file.open("rb"):
+                while chunk := pdf_file.read(CHUNK_SIZE):
+                    entry.write(chunk)
+                    if data := stream.pop():
+                        yield data
+
+            if data := stream.pop():
+                yield data
+
+    yield stream.pop()
@@ -0,0 +1,74 @@
+import json
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from check_generation_service import settings
+from check_service.benchmark import Benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays synthetic orders against the checks API while the printers "
+        "poll for their checks & reports the latencies as JSON."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--orders", type=int, default=200)
+        parser.add_argument("--points", type=int, default=4)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=8,
+            help="The number of orders created at the same time.",
+        )
+        parser.add_argument(
+            "--workers",
+            action="store_true",
+            help="Render the checks with the running Celery workers "
+            "instead of eagerly in the benchmark process.",
+        )
+        parser.add_argument(
+            "--renderer",
+            help="The renderer class used in the eager mode "
+            "instead of CHECK_PDF_RENDERER.",
+        )
+        parser.add_argument(
+            "--poll-wait",
+            type=float,
+            default=1,
+            help="The `wait` query parameter of the printer polls.",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=300,
+            help="The number of seconds to wait for all checks to be printed.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the report to the file.")
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        The method runs the benchmark on temporary printers,
+        which are deleted with their checks afterwards.
+        """
+        if options["renderer"]:
+            settings.CHECK_PDF_RENDERER = options["renderer"]
+
+        benchmark = Benchmark(
+            orders=options["orders"],
+            points=options["points"],
+            concurrency=options["concurrency"],
+            eager=not options["workers"],
+            poll_wait=options["poll_wait"],
+            timeout=options["timeout"],
+            seed=options["seed"],
+        )
+        report = json.dumps(benchmark.run(), indent=2)
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                file.write(report + "\n")
+        else:
+            self.stdout.write(report)
@@ -0,0 +1,56 @@
+from datetime import date
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connection, transaction
+from django.utils import timezone
+
+from check_generation_service import settings
+from check_service import partitions
+
+
+class Command(BaseCommand):
+    help = (
+        "Partitions the check table by month, creates the partitions "
+        "in advance & detaches the old ones."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=settings.CHECK_PARTITIONS_AHEAD,
+            help="The number of monthly partitions created in advance.",
+        )
+        parser.add_argument(
+            "--detach-before",
+            type=date.fromisoformat,
+            help="Detach the partitions of the checks created before "
+            "the date (YYYY-MM-DD).",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        The method partitions the check table if it is not partitioned yet
+        & maintains its partitions.
+        """
+        if connection.vendor != "postgresql":
+            self.stderr.write("Partitioning requires PostgreSQL.")
+            return
+
+        today = timezone.now().date()
+
+        with transaction.atomic():
+            if not partitions.is_partitioned():
+                partitions.partition_check_table(today)
+                self.stdout.write("Partitioned the check table.")
+
+            for name in partitions.create_partitions(today, options["months"]):
+                self.stdout.write(f"Created partition {name}.")
+
+        if options["detach_before"]:
+            with transaction.atomic():
+                for name in partitions.detach_partitions(
+                    options["detach_before"]
+                ):
+                    self.stdout.write(f"Detached partition {name}.")
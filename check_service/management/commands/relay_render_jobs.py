@@ -0,0 +1,52 @@
+import time
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandParser
+
+from check_generation_service import settings
+from check_service.outbox import relay_render_jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Publishes the rendering jobs of the outbox to Celery "
+        "until it is stopped."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.CHECK_OUTBOX_BATCH_SIZE,
+            help="The maximum number of jobs published at a time.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.CHECK_OUTBOX_INTERVAL,
+            help="The number of seconds to wait when the outbox is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Publish the jobs in the outbox & exit.",
+        )
+
+    def handle(self, *args: Any, **options: Any) -> None:
+        """
+        The method publishes the jobs in batches, without waiting
+        as long as full batches are found.
+        """
+        while True:
+            stats = relay_render_jobs(options["batch_size"])
+            if stats["jobs"]:
+                self.stdout.write(
+                    f"Published {stats['jobs']} jobs "
+                    f"in {stats['tasks']} tasks."
+                )
+
+            if stats["jobs"] < options["batch_size"]:
+                if options["once"]:
+                    return
+
+                time.sleep(options["interval"])
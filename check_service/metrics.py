@@ -0,0 +1,169 @@
+import time
+from typing import Awaitable, Callable, Iterator
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db.models import Count
+from django.http import HttpRequest, HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily, Metric
+
+from check_generation_service import settings
+from check_service.models import Check, RenderJob
+
+REQUEST_DURATION = Histogram(
+    "check_service_request_duration_seconds",
+    "The time spent on a request by the endpoint.",
+    ["method", "endpoint", "status"],
+)
+RENDER_DURATION = Histogram(
+    "check_service_render_duration_seconds",
+    "The time spent on rendering a batch of checks by the stage.",
+    ["stage"],
+)
+RENDERED_CHECKS = Counter(
+    "check_service_rendered_checks_total",
+    "The number of rendered checks.",
+)
+RENDER_FAILURES = Counter(
+    "check_service_render_failures_total",
+    "The number of checks that failed to render.",
+)
+PRINT_POLLS = Counter(
+    "check_service_print_polls_total",
+    "The number of printer polls by the result.",
+    ["result"],
+)
+PDF_CACHE_LOOKUPS = Counter(
+    "check_service_pdf_cache_lookups_total",
+    "The number of pdf cache lookups by the result.",
+    ["result"],
+)
+PDF_BYTES_SERVED = Counter(
+    "check_service_pdf_bytes_served_total",
+    "The number of pdf bytes served for download.",
+)
+
+
+class QueueDepthCollector:
+    """
+    The collector counts the new & rendered checks of every printer
+    & the jobs in the outbox when the metrics are scraped.
+    """
+
+    def collect(self) -> Iterator[Metric]:
+        queue_depth = GaugeMetricFamily(
+            "check_service_queue_depth",
+            "The number of checks waiting to be rendered or printed.",
+            labels=["printer_id", "status"],
+        )
+        counts = (
+            Check.objects.recent()
+            .filter(
+                status__in=[
+                    Check.StatusChoices.NEW,
+                    Check.StatusChoices.RENDERED,
+                ]
+            )
+            .values_list("printer_id", "status")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
+        for printer_id, status, count in counts:
+            queue_depth.add_metric([str(printer_id), status], count)
+
+        yield queue_depth
+
+        outbox_jobs = GaugeMetricFamily(
+            "check_service_outbox_jobs",
+            "The number of rendering jobs waiting in the outbox.",
+        )
+        outbox_jobs.add_metric([], RenderJob.objects.count())
+
+        yield outbox_jobs
+
+
+queue_registry = CollectorRegistry()
+queue_registry.register(QueueDepthCollector())
+
+
+class MetricsMiddleware:
+    """
+    The middleware measures the duration of the requests by the name of
+    the matched url pattern, so that the ids in the paths do not create
+    a time series each.
+
+    The middleware supports async requests, so that the async views
+    are not run in a thread because of it.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(
+        self, request: HttpRequest
+    ) -> HttpResponse | Awaitable[HttpResponse]:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        started_at = time.perf_counter()
+        response = self.get_response(request)
+        self.observe(request, response, started_at)
+
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        started_at = time.perf_counter()
+        response = await self.get_response(request)
+        self.observe(request, response, started_at)
+
+        return response
+
+    @staticmethod
+    def observe(
+        request: HttpRequest, response: HttpResponse, started_at: float
+    ) -> None:
+        match = request.resolver_match
+        REQUEST_DURATION.labels(
+            request.method,
+            match.view_name if match else "unmatched",
+            response.status_code,
+        ).observe(time.perf_counter() - started_at)
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """
+    The view returns the metrics of all processes when
+    `PROMETHEUS_MULTIPROC_DIR` is set, or of this process otherwise.
+    """
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+
+    return HttpResponse(
+        generate_latest(registry) + generate_latest(queue_registry),
+        content_type=CONTENT_TYPE_LATEST,
+    )
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    The function removes the live gauges of a stopped process
+    from the multiprocess metrics.
+    """
+    if settings.PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,58 @@
+# Generated by Django 4.1.7 on 2026-10-18 10:46
+
+from django.db import migrations, models
+
+
+def populate_order_id(apps, schema_editor) -> None:
+    """
+    The function copies the order id from the order JSON of existing checks.
+    """
+    Check = apps.get_model("check_service", "Check")
+    checks = []
+
+    for check in Check.objects.only("id", "order").iterator(chunk_size=1000):
+        if isinstance(check.order, dict) and "order_id" in check.order:
+            check.order_id = check.order["order_id"]
+            checks.append(check)
+
+        # The checks are updated a chunk at a time,
+        # so that they are not all held in memory.
+        if len(checks) >= 1000:
+            Check.objects.bulk_update(checks, ["order_id"])
+            checks = []
+
+    Check.objects.bulk_update(checks, ["order_id"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("check_service", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="check",
+            name="order_id",
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(populate_order_id, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="printer",
+            name="point_id",
+            field=models.IntegerField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name="check",
+            index=models.Index(
+                fields=["printer_id", "status"],
+                name="check_printer_status_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="check",
+            constraint=models.UniqueConstraint(
+                fields=("order_id", "printer_id"),
+                name="unique_order_check_per_printer",
+            ),
+        ),
+    ]
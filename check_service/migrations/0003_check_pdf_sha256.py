@@ -0,0 +1,17 @@
+# Generated by Django 4.1.7 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("check_service", "0002_check_order_id_and_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="check",
+            name="pdf_sha256",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
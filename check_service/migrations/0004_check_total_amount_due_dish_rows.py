@@ -0,0 +1,28 @@
+# Generated by Django 4.1.7 on 2026-10-18 10:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("check_service", "0003_check_pdf_sha256"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="check",
+            name="dish_rows",
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+        migrations.AddField(
+            model_name="check",
+            name="total_amount_due",
+            field=models.DecimalField(
+                blank=True,
+                decimal_places=2,
+                editable=False,
+                max_digits=12,
+                null=True,
+            ),
+        ),
+    ]
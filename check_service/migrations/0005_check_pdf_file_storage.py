@@ -0,0 +1,23 @@
+# Generated by Django 4.1.7 on 2026-10-18 10:56
+
+import check_service.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("check_service", "0004_check_total_amount_due_dish_rows"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="check",
+            name="pdf_file",
+            field=models.FileField(
+                blank=True,
+                null=True,
+                storage=check_service.storage.get_pdf_storage,
+                upload_to=check_service.storage.pdf_upload_to,
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.1.7 on 2026-10-18 10:57
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("check_service", "0005_check_pdf_file_storage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="check",
+            name="created_at",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                db_index=True,
+                default=django.utils.timezone.now,
+            ),
+            preserve_default=False,
+        ),
+    ]
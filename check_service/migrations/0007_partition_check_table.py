@@ -0,0 +1,150 @@
+from datetime import date
+
+from django.db import migrations
+from django.utils import timezone
+
+from check_generation_service import settings
+
+# The SQL is a frozen copy of `check_service.partitions` as of this
+# migration, so that later changes to the module do not change it.
+TABLE = "check_service_check"
+LEGACY_TABLE = f"{TABLE}_legacy"
+
+
+def month_start(day: date, months: int = 0) -> date:
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    return date(year, month + 1, 1)
+
+
+def partition_check_table(schema_editor, today: date) -> None:
+    """
+    The function turns the check table into a table partitioned by month
+    of `created_at`, with the existing rows left in place as the partition
+    of everything before the next month.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        # A table with deferred foreign key checks pending can not be altered.
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE tablename = %s AND indexname NOT IN ("
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass"
+            ")",
+            [TABLE, TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f"SELECT max(id) FROM {TABLE}")
+        (last_id,) = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}")
+        for name, _ in indexes:
+            cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name}_legacy"')
+        cursor.execute(
+            f"ALTER TABLE {LEGACY_TABLE} DROP CONSTRAINT {TABLE}_pkey"
+        )
+        cursor.execute(
+            f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT "
+            f"unique_order_check_per_printer TO {LEGACY_TABLE}_order_uniq"
+        )
+
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS "
+            "INCLUDING IDENTITY INCLUDING STORAGE) "
+            "PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {LEGACY_TABLE} ALTER COLUMN id DROP IDENTITY"
+        )
+        if last_id is not None:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)",
+                [TABLE, last_id],
+            )
+        cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, created_at)")
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(
+                f'ALTER TABLE {TABLE} ADD CONSTRAINT "{name}" {definition}'
+            )
+
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {LEGACY_TABLE} "
+            "FOR VALUES FROM (MINVALUE) TO (%s)",
+            [month_start(today, 1)],
+        )
+        # The rows that fall outside all partitions land in the default one,
+        # which stays empty as long as the partitions are created in advance.
+        cursor.execute(
+            f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT"
+        )
+        cursor.execute(
+            f"CREATE UNIQUE INDEX {TABLE}_default_order_uniq "
+            f"ON {TABLE}_default (order_id, printer_id_id)"
+        )
+
+
+def create_partitions(schema_editor, today: date, months: int) -> None:
+    """
+    The function creates the monthly partitions from the next month up to
+    `months` months ahead.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        for offset in range(1, months + 1):
+            start = month_start(today, offset)
+            name = f"{TABLE}_y{start.year}m{start.month:02d}"
+
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is not None:
+                continue
+
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {TABLE} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                [start, month_start(start, 1)],
+            )
+            cursor.execute(
+                f"CREATE UNIQUE INDEX {name}_order_uniq "
+                f"ON {name} (order_id, printer_id_id)"
+            )
+
+
+def partition_table(apps, schema_editor) -> None:
+    """
+    The function partitions the check table by month when
+    `CHECK_PARTITIONED_TABLE` is enabled on PostgreSQL.
+    """
+    if (
+        schema_editor.connection.vendor != "postgresql"
+        or not settings.CHECK_PARTITIONED_TABLE
+    ):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(%s)",
+            [TABLE],
+        )
+        if cursor.fetchone() is not None:
+            return
+
+    today = timezone.now().date()
+    partition_check_table(schema_editor, today)
+    create_partitions(schema_editor, today, settings.CHECK_PARTITIONS_AHEAD)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("check_service", "0006_check_created_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_table, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("check_service", "0007_partition_check_table"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="check",
+            name="render_after",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="check",
+            name="render_attempts",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="check",
+            name="render_error",
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AlterField(
+            model_name="check",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("new", "New"),
+                    ("rendered", "Rendered"),
+                    ("printed", "Printed"),
+                    ("failed", "Failed"),
+                ],
+                default="new",
+                max_length=8,
+            ),
+        ),
+    ]
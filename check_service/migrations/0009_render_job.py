@@ -0,0 +1,42 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("check_service", "0008_check_render_failures"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RenderJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("check_ids", models.JSONField()),
+                (
+                    "check_type",
+                    models.CharField(
+                        choices=[("kitchen", "Kitchen"), ("client", "Client")],
+                        max_length=7,
+                    ),
+                ),
+                ("priority", models.PositiveSmallIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="renderjob",
+            index=models.Index(
+                fields=["priority", "id"], name="render_job_priority_idx"
+            ),
+        ),
+    ]
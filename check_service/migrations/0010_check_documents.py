@@ -0,0 +1,30 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("check_service", "0009_render_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="check",
+            name="document_gz",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="printer",
+            name="output_format",
+            field=models.CharField(
+                choices=[
+                    ("pdf", "Pdf"),
+                    ("html", "Html"),
+                    ("escpos", "ESC/POS"),
+                ],
+                default="pdf",
+                max_length=6,
+            ),
+        ),
+    ]
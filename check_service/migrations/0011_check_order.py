@@ -0,0 +1,45 @@
+# Generated by Django 4.1.7 on 2026-10-18 11:37
+
+from itertools import islice
+
+from django.db import migrations, models
+
+
+def populate_check_orders(apps, schema_editor) -> None:
+    """
+    The function registers the orders of the existing checks.
+    """
+    Check = apps.get_model("check_service", "Check")
+    CheckOrder = apps.get_model("check_service", "CheckOrder")
+    order_ids = (
+        Check.objects.filter(order_id__isnull=False)
+        .values_list("order_id", flat=True)
+        .distinct()
+        .iterator(chunk_size=1000)
+    )
+
+    while chunk := list(islice(order_ids, 1000)):
+        CheckOrder.objects.bulk_create(
+            [CheckOrder(order_id=order_id) for order_id in chunk],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("check_service", "0010_check_documents"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CheckOrder",
+            fields=[
+                (
+                    "order_id",
+                    models.IntegerField(primary_key=True, serialize=False),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(populate_check_orders, migrations.RunPython.noop),
+    ]
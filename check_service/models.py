@@ -1,4 +1,13 @@
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from typing import Any
+
 from django.db import models
+from django.template.defaultfilters import floatformat
+from django.utils import timezone
+
+from check_generation_service import settings
+from check_service.storage import get_pdf_storage, pdf_upload_to
 
 
 class CheckTypeChoices(models.TextChoices):
@@ -6,13 +15,24 @@ class CheckTypeChoices(models.TextChoices):
     CLIENT = "client"
 
 
+class OutputFormatChoices(models.TextChoices):
+    PDF = "pdf"
+    HTML = "html"
+    ESCPOS = "escpos", "ESC/POS"
+
+
 class Printer(models.Model):
     name = models.CharField(max_length=70)
     api_key = models.CharField(max_length=70, unique=True)
     check_type = models.CharField(
         max_length=7, choices=CheckTypeChoices.choices
     )
-    point_id = models.IntegerField()
+    point_id = models.IntegerField(db_index=True)
+    output_format = models.CharField(
+        max_length=6,
+        choices=OutputFormatChoices.choices,
+        default=OutputFormatChoices.PDF,
+    )
 
     def __str__(self) -> str:
         """
@@ -22,11 +42,28 @@ class Printer(models.Model):
         return f"Printer name: {self.name}. Check type: {self.check_type}."
 
 
+class CheckQuerySet(models.QuerySet):
+    def recent(self) -> "CheckQuerySet":
+        """
+        The method limits the checks to the ones created in the last
+        `CHECK_ACTIVE_DAYS` days, so that only the recent partitions
+        of a partitioned table are scanned.
+        """
+        if not settings.CHECK_ACTIVE_DAYS:
+            return self
+
+        return self.filter(
+            created_at__gte=timezone.now()
+            - timedelta(days=settings.CHECK_ACTIVE_DAYS)
+        )
+
+
 class Check(models.Model):
     class StatusChoices(models.TextChoices):
         NEW = "new"
         RENDERED = "rendered"
         PRINTED = "printed"
+        FAILED = "failed"
 
     printer_id = models.ForeignKey(
         Printer, on_delete=models.CASCADE, related_name="checks"
@@ -35,10 +72,101 @@ class Check(models.Model):
         max_length=7, choices=CheckTypeChoices.choices
     )
     order = models.JSONField()
+    order_id = models.IntegerField(null=True, blank=True, editable=False)
     status = models.CharField(
         max_length=8, choices=StatusChoices.choices, default=StatusChoices.NEW
     )
-    pdf_file = models.FileField(upload_to="pdf/", null=True, blank=True)
+    pdf_file = models.FileField(
+        upload_to=pdf_upload_to,
+        storage=get_pdf_storage,
+        null=True,
+        blank=True,
+    )
+    pdf_sha256 = models.CharField(max_length=64, blank=True, editable=False)
+    total_amount_due = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    dish_rows = models.JSONField(default=list, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    render_attempts = models.PositiveSmallIntegerField(
+        default=0, editable=False
+    )
+    render_error = models.TextField(blank=True, editable=False)
+    render_after = models.DateTimeField(null=True, blank=True, editable=False)
+    # The gzipped html page of a pdf check rendered at ingestion, or the
+    # final document of a check for a html or ESC/POS printer.
+    document_gz = models.BinaryField(null=True, blank=True, editable=False)
+
+    objects = CheckQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order_id", "printer_id"],
+                name="unique_order_check_per_printer",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["printer_id", "status"],
+                name="check_printer_status_idx",
+            )
+        ]
+
+    @classmethod
+    def for_printer(cls, printer: Printer, order: dict) -> "Check":
+        """
+        The method returns a new check of the order for the printer.
+        """
+        check = cls(
+            printer_id=printer, check_type=printer.check_type, order=order
+        )
+        check.populate_from_order()
+        return check
+
+    def populate_from_order(self) -> None:
+        """
+        The method computes the columns derived from the order: the order id,
+        the total amount due & the formatted dish rows of the check.
+        """
+        if not isinstance(self.order, dict):
+            return
+
+        if "order_id" in self.order:
+            self.order_id = self.order["order_id"]
+
+        dishes = self.order.get("dishes")
+        if not isinstance(dishes, list):
+            return
+
+        try:
+            self.total_amount_due = sum(
+                Decimal(str(dish["total_price"])) for dish in dishes
+            )
+            self.dish_rows = [
+                [
+                    dish.get("name", ""),
+                    dish.get("amount", ""),
+                    floatformat(dish.get("price_one_dish", ""), 2),
+                    floatformat(dish["total_price"], 2),
+                ]
+                for dish in dishes
+            ]
+        except (AttributeError, KeyError, TypeError, InvalidOperation):
+            self.total_amount_due = None
+            self.dish_rows = []
+
+    def save(self, *args: Any, **kwargs: Any) -> None:
+        """
+        The method keeps the columns derived from the order in sync with it.
+        """
+        self.populate_from_order()
+
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         """
@@ -49,3 +177,34 @@ class Check(models.Model):
             f"Printer id: {self.printer_id}. "
             f"Check type: {self.check_type}. Status: {self.status}."
         )
+
+
+class CheckOrder(models.Model):
+    """
+    The orders that have checks. The table is not partitioned, so that an
+    order id stays unique across the monthly partitions of the check table.
+    """
+
+    order_id = models.IntegerField(primary_key=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class RenderJob(models.Model):
+    """
+    The transactional outbox of the rendering tasks: the jobs are written
+    along with their checks & published to Celery by the relay.
+    """
+
+    check_ids = models.JSONField()
+    check_type = models.CharField(
+        max_length=7, choices=CheckTypeChoices.choices
+    )
+    priority = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["priority", "id"], name="render_job_priority_idx"
+            )
+        ]
@@ -0,0 +1,103 @@
+import logging
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator
+
+import redis
+
+from check_generation_service import settings
+
+logger = logging.getLogger(__name__)
+
+
+def channel(printer_id: int) -> str:
+    return f"check_service:printer:{printer_id}"
+
+
+@lru_cache(maxsize=None)
+def get_redis() -> redis.Redis | None:
+    """
+    The function returns the Redis client used for the notifications,
+    or `None` if no Redis server is configured.
+    """
+    url = settings.CHECK_NOTIFICATIONS_URL
+    if not url or not url.startswith(("redis://", "rediss://", "unix://")):
+        return None
+
+    return redis.Redis.from_url(url)
+
+
+def notify_printers(printer_ids: Iterable[int]) -> None:
+    """
+    The function wakes up the printers waiting for new checks. It runs
+    after a commit, so a Redis error is only logged: the printers find
+    the checks when their long poll times out.
+    """
+    client = get_redis()
+    if client is None:
+        return
+
+    printer_ids = set(printer_ids)
+    try:
+        with client.pipeline(transaction=False) as pipeline:
+            for printer_id in printer_ids:
+                pipeline.publish(channel(printer_id), "rendered")
+            pipeline.execute()
+    except redis.RedisError:
+        logger.exception("The printers %s were not notified.", printer_ids)
+
+
+@contextmanager
+def subscribe(printer_id: int) -> Iterator[Callable[[float], bool]]:
+    """
+    The function subscribes to the notifications of the printer & yields
+    a function that waits up to the given number of seconds for one.
+
+    The subscription must be made before the checks are looked up,
+    so that no notification is missed in between. Without Redis, or when
+    Redis fails, the waiting function sleeps for `CHECK_LONG_POLL_INTERVAL`
+    seconds, so that the checks are polled from the database instead.
+    """
+
+    def poll(timeout: float) -> bool:
+        time.sleep(min(timeout, settings.CHECK_LONG_POLL_INTERVAL))
+        return True
+
+    client = get_redis()
+
+    if client is None:
+        yield poll
+        return
+
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    try:
+        pubsub.subscribe(channel(printer_id))
+    except redis.RedisError:
+        logger.exception("The printer %s is polling instead.", printer_id)
+        pubsub.close()
+        yield poll
+        return
+
+    def wait(timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+
+        # Subscription confirmations are read as `None` messages too.
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                message = pubsub.get_message(timeout=remaining)
+            except redis.RedisError:
+                logger.exception(
+                    "The printer %s is polling instead.", printer_id
+                )
+                return poll(remaining)
+
+            if message is not None:
+                return True
+
+        return False
+
+    try:
+        yield wait
+    finally:
+        pubsub.close()
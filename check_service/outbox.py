@@ -0,0 +1,53 @@
+from collections import defaultdict
+
+from django.db import transaction
+
+from check_generation_service import celery_app, settings
+from check_service.models import RenderJob
+from check_service.tasks import generate_pdf
+
+
+def relay_render_jobs(batch_size: int) -> dict[str, int]:
+    """
+    The function publishes up to `batch_size` jobs of the outbox to Celery
+    & deletes them. The check ids of the jobs of the same check type &
+    priority are merged into tasks of up to `CHECK_PDF_BATCH_SIZE` checks,
+    all sent through one producer.
+
+    The jobs are deleted only after they are published, so a job is
+    published again if the relay dies in between, & is never lost.
+    """
+    with transaction.atomic():
+        jobs = list(
+            RenderJob.objects.select_for_update(skip_locked=True).order_by(
+                "priority", "id"
+            )[:batch_size]
+        )
+        if not jobs:
+            return {"jobs": 0, "tasks": 0}
+
+        groups = defaultdict(list)
+        for job in jobs:
+            groups[job.check_type, job.priority].extend(job.check_ids)
+
+        tasks = 0
+        with celery_app.producer_or_acquire() as producer:
+            for (check_type, priority), check_ids in groups.items():
+                for start in range(
+                    0, len(check_ids), settings.CHECK_PDF_BATCH_SIZE
+                ):
+                    generate_pdf.apply_async(
+                        (
+                            check_ids[
+                                start : start + settings.CHECK_PDF_BATCH_SIZE
+                            ],
+                        ),
+                        {"check_type": check_type},
+                        priority=priority,
+                        producer=producer,
+                    )
+                    tasks += 1
+
+        RenderJob.objects.filter(id__in=[job.id for job in jobs]).delete()
+
+    return {"jobs": len(jobs), "tasks": tasks}
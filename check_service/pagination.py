@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+from check_generation_service import settings
+
+
+class IdCursorPagination(CursorPagination):
+    """
+    The pagination seeks to the next page by the primary key, so a page
+    costs the same index scan no matter how deep it is.
+    """
+
+    ordering = "id"
+    page_size_query_param = "page_size"
+    max_page_size = settings.API_MAX_PAGE_SIZE
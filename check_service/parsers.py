@@ -0,0 +1,40 @@
+import codecs
+import json
+from typing import Any, Mapping
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class NDJSONParser(BaseParser):
+    """
+    The parser reads a newline-delimited JSON stream
+    & returns the list of its objects.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def parse(
+        self,
+        stream: Any,
+        media_type: str | None = None,
+        parser_context: Mapping[str, Any] | None = None,
+    ) -> list[Any]:
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        decoded_stream = codecs.getreader(encoding)(stream)
+        objects = []
+
+        for line_number, line in enumerate(decoded_stream, start=1):
+            if not line.strip():
+                continue
+
+            try:
+                objects.append(json.loads(line))
+            except ValueError as error:
+                raise ParseError(
+                    f"NDJSON parse error on line {line_number} - {error}"
+                )
+
+        return objects
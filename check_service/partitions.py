@@ -0,0 +1,182 @@
+from datetime import date
+
+from django.db import connection
+
+from check_service.models import Check
+
+TABLE = Check._meta.db_table
+LEGACY_TABLE = f"{TABLE}_legacy"
+
+
+def month_start(day: date, months: int = 0) -> date:
+    """
+    The function returns the first day of the month
+    `months` months after the month of the day.
+    """
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    return date(year, month + 1, 1)
+
+
+def partition_name(start: date) -> str:
+    return f"{TABLE}_y{start.year}m{start.month:02d}"
+
+
+def is_partitioned() -> bool:
+    """
+    The function checks if the check table is partitioned.
+    """
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table "
+            "WHERE partrelid = to_regclass(%s)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_check_table(today: date) -> None:
+    """
+    The function turns the check table into a table partitioned by month
+    of `created_at`. The existing rows stay in place as the partition of
+    everything before the next month.
+
+    The primary key of a partitioned table must contain the partition key,
+    so it becomes (`id`, `created_at`), and the unique order per printer
+    is enforced within each partition. The order ids are kept unique
+    across the partitions by the `CheckOrder` table.
+    """
+    with connection.cursor() as cursor:
+        # A table with deferred foreign key checks pending can not be altered.
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        cursor.execute(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE tablename = %s AND indexname NOT IN ("
+            "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass"
+            ")",
+            [TABLE, TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute(f"SELECT max(id) FROM {TABLE}")
+        (last_id,) = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}")
+        for name, _ in indexes:
+            cursor.execute(f'ALTER INDEX "{name}" RENAME TO "{name}_legacy"')
+        cursor.execute(
+            f"ALTER TABLE {LEGACY_TABLE} DROP CONSTRAINT {TABLE}_pkey"
+        )
+        cursor.execute(
+            f"ALTER TABLE {LEGACY_TABLE} RENAME CONSTRAINT "
+            f"unique_order_check_per_printer TO {LEGACY_TABLE}_order_uniq"
+        )
+
+        cursor.execute(
+            f"CREATE TABLE {TABLE} (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS "
+            "INCLUDING IDENTITY INCLUDING STORAGE) "
+            "PARTITION BY RANGE (created_at)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {LEGACY_TABLE} ALTER COLUMN id DROP IDENTITY"
+        )
+        if last_id is not None:
+            cursor.execute(
+                "SELECT setval(pg_get_serial_sequence(%s, 'id'), %s)",
+                [TABLE, last_id],
+            )
+        cursor.execute(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, created_at)")
+        for _, definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(
+                f'ALTER TABLE {TABLE} ADD CONSTRAINT "{name}" {definition}'
+            )
+
+        cursor.execute(
+            f"ALTER TABLE {TABLE} ATTACH PARTITION {LEGACY_TABLE} "
+            "FOR VALUES FROM (MINVALUE) TO (%s)",
+            [month_start(today, 1)],
+        )
+        # The rows that fall outside all partitions land in the default one,
+        # which stays empty as long as the partitions are created in advance.
+        cursor.execute(
+            f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT"
+        )
+        cursor.execute(
+            f"CREATE UNIQUE INDEX {TABLE}_default_order_uniq "
+            f"ON {TABLE}_default (order_id, printer_id_id)"
+        )
+
+
+def create_partitions(today: date, months: int) -> list[str]:
+    """
+    The function creates the monthly partitions from the next month up to
+    `months` months ahead & returns the names of the created partitions.
+    """
+    created = []
+
+    with connection.cursor() as cursor:
+        for offset in range(1, months + 1):
+            start = month_start(today, offset)
+            name = partition_name(start)
+
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0] is not None:
+                continue
+
+            cursor.execute(
+                f"CREATE TABLE {name} PARTITION OF {TABLE} "
+                "FOR VALUES FROM (%s) TO (%s)",
+                [start, month_start(start, 1)],
+            )
+            cursor.execute(
+                f"CREATE UNIQUE INDEX {name}_order_uniq "
+                f"ON {name} (order_id, printer_id_id)"
+            )
+            created.append(name)
+
+    return created
+
+
+def detach_partitions(before: date) -> list[str]:
+    """
+    The function detaches the partitions that hold only checks created
+    before the day & returns their names. Detaching only changes the
+    catalog, so it takes the same time for any number of rows; the
+    detached tables can be archived & dropped afterwards.
+    """
+    detached = []
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname, "
+            "pg_get_expr(child.relpartbound, child.oid) "
+            "FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass "
+            "ORDER BY child.relname",
+            [TABLE],
+        )
+        partitions = cursor.fetchall()
+
+        for name, bound in partitions:
+            if bound == "DEFAULT":
+                continue
+
+            # The bound reads "FOR VALUES FROM (...) TO ('<timestamp>')".
+            upper = bound.rsplit("TO ('", 1)[1][:10]
+            if date.fromisoformat(upper) > before:
+                continue
+
+            cursor.execute(f"ALTER TABLE {TABLE} DETACH PARTITION {name}")
+            detached.append(name)
+
+    return detached
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+import uuid
+from pathlib import Path
+
+from check_generation_service import settings
+
+
+class PdfCache:
+    """
+    The content-addressed cache of rendered pdf files.
+
+    Every pdf file is stored under the sha256 hash of the html page it was
+    rendered from & is hard linked to the checks that use it. When the size
+    of the cache on the disk, shared by all the worker processes, exceeds
+    `max_size` bytes, the least recently used files are evicted.
+    """
+
+    def __init__(self, root: Path, max_size: int) -> None:
+        self.root = Path(root)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def key(html: str) -> str:
+        """
+        The method returns the cache key of a html page.
+        """
+        return hashlib.sha256(html.encode()).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.pdf"
+
+    def get(self, key: str) -> tuple[Path, bytes] | None:
+        """
+        The method returns the path & the content of a cached pdf file
+        or `None`. The content is read right away, so that it is still
+        at hand if the file is evicted by another process afterwards.
+        """
+        path = self.path(key)
+
+        try:
+            # The modification time is the last access time of the entry.
+            os.utime(path)
+            return path, path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, source: str | Path) -> None:
+        """
+        The method adds a rendered pdf file to the cache.
+        The cache is fitted into `max_size` bytes by `evict`.
+        """
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.link(source, path)
+
+    @staticmethod
+    def link(source: str | Path, destination: str | Path) -> None:
+        """
+        The method atomically hard links the source file to the destination.
+        The link is made under a name of its own first, so that concurrent
+        links to the same destination do not take each other's place.
+        """
+        temp_path = f"{destination}.{uuid.uuid4().hex}.tmp"
+
+        try:
+            try:
+                os.link(source, temp_path)
+            except OSError:
+                # Hard links can not cross file systems, so fall back
+                # to a copy.
+                with open(source, "rb") as src, open(temp_path, "wb") as dst:
+                    dst.write(src.read())
+
+            os.replace(temp_path, destination)
+        finally:
+            # The rename does nothing when the destination is already
+            # a link to the same file, so the temporary link is left.
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+
+    def evict(self) -> None:
+        """
+        The method removes the least recently used files until the cache
+        fits into `max_size` bytes. The size is measured on the disk, so that
+        the files added by the other processes count too.
+        """
+        with self._lock:
+            entries = []
+            for path in self.root.glob("*/*.pdf"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total_size = sum(size for _, size, _ in entries)
+
+            for _, size, path in sorted(entries):
+                if total_size <= self.max_size:
+                    break
+
+                path.unlink(missing_ok=True)
+                total_size -= size
+
+
+pdf_cache = PdfCache(
+    settings.CHECK_PDF_CACHE_DIR, settings.CHECK_PDF_CACHE_MAX_SIZE
+)
@@ -0,0 +1,115 @@
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from check_generation_service import settings
+from check_service.models import Printer
+
+PRINTER_FIELDS = (
+    "id",
+    "name",
+    "api_key",
+    "check_type",
+    "point_id",
+    "output_format",
+)
+
+
+class PrinterRegistry:
+    """
+    The registry resolves printers by point id & api key without
+    database queries on the warm path.
+
+    A snapshot of all printers is shared by the processes through the
+    Django cache & memoized in-process for `local_timeout` seconds.
+    """
+
+    cache_key = "check_service:printer-registry:2"
+
+    def __init__(self, timeout: int, local_timeout: float) -> None:
+        self.timeout = timeout
+        self.local_timeout = local_timeout
+        self._snapshot: dict | None = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        snapshot = {"points": {}, "api_keys": {}}
+
+        for row in Printer.objects.values_list(*PRINTER_FIELDS):
+            printer = dict(zip(PRINTER_FIELDS, row))
+            snapshot["points"].setdefault(printer["point_id"], []).append(row)
+            snapshot["api_keys"][printer["api_key"]] = row
+
+        return snapshot
+
+    def _get_local_snapshot(self) -> dict | None:
+        with self._lock:
+            if (
+                self._snapshot is not None
+                and time.monotonic() < self._expires_at
+            ):
+                return self._snapshot
+
+        return None
+
+    def _get_snapshot(self) -> dict:
+        if (snapshot := self._get_local_snapshot()) is not None:
+            return snapshot
+
+        snapshot = cache.get(self.cache_key)
+        if snapshot is None:
+            snapshot = self._load()
+            cache.set(self.cache_key, snapshot, self.timeout)
+
+        with self._lock:
+            self._snapshot = snapshot
+            self._expires_at = time.monotonic() + self.local_timeout
+
+        return snapshot
+
+    @staticmethod
+    def _printer(row: tuple) -> Printer:
+        return Printer.from_db("default", PRINTER_FIELDS, row)
+
+    def printers_for_point(self, point_id: int) -> list[Printer]:
+        """
+        The method returns all printers of the point.
+        """
+        rows = self._get_snapshot()["points"].get(point_id, [])
+        return [self._printer(row) for row in rows]
+
+    async def aprinters_for_point(self, point_id: int) -> list[Printer]:
+        """
+        The method is the async version of `printers_for_point`, which
+        loads the snapshot in a thread only when it is not memoized.
+        """
+        snapshot = self._get_local_snapshot()
+        if snapshot is None:
+            snapshot = await sync_to_async(self._get_snapshot)()
+
+        rows = snapshot["points"].get(point_id, [])
+        return [self._printer(row) for row in rows]
+
+    def printer_by_api_key(self, api_key: str) -> Printer | None:
+        """
+        The method returns the printer with the api key or `None`.
+        """
+        row = self._get_snapshot()["api_keys"].get(api_key)
+        return self._printer(row) if row else None
+
+    def invalidate(self) -> None:
+        """
+        The method drops the cached snapshot of the printers.
+        """
+        cache.delete(self.cache_key)
+
+        with self._lock:
+            self._snapshot = None
+
+
+printer_registry = PrinterRegistry(
+    settings.PRINTER_REGISTRY_TIMEOUT, settings.PRINTER_REGISTRY_LOCAL_TIMEOUT
+)
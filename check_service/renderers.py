@@ -0,0 +1,135 @@
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+from check_generation_service import settings
+
+
+class RenderError(Exception):
+    """
+    The exception is raised when a html page can not be converted
+    to a pdf document.
+    """
+
+
+class BaseRenderer:
+    """
+    The base class for the html to pdf converters.
+    """
+
+    def render(self, html: str) -> bytes:
+        """
+        The method converts a html page to a pdf document
+        or raises `RenderError`.
+        """
+        pdf = self._render_or_error(html)
+        if isinstance(pdf, RenderError):
+            raise pdf
+
+        return pdf
+
+    def render_many(self, htmls: list[str]) -> list[bytes | RenderError]:
+        """
+        The method converts a batch of html pages to pdf documents,
+        one document per page. A page that fails to render gets its
+        `RenderError` in place of the document, so that it does not fail
+        the rest of the batch.
+        """
+        return self._render_many(htmls)
+
+    def _render(self, html: str) -> bytes:
+        raise NotImplementedError
+
+    def _render_or_error(self, html: str) -> bytes | RenderError:
+        try:
+            pdf = self._render(html)
+        except RenderError as error:
+            return error
+
+        if not pdf.startswith(b"%PDF"):
+            return RenderError("The renderer returned no pdf document.")
+
+        return pdf
+
+    def _render_many(self, htmls: list[str]) -> list[bytes | RenderError]:
+        return [self._render_or_error(html) for html in htmls]
+
+
+class WkhtmltopdfRenderer(BaseRenderer):
+    """
+    The renderer runs the wkhtmltopdf binary directly, without a shell.
+    """
+
+    def __init__(self) -> None:
+        self.command = [settings.WKHTMLTOPDF_CMD, "--quiet", "-", "-"]
+
+    def _render(self, html: str) -> bytes:
+        try:
+            result = subprocess.run(
+                self.command,
+                input=html.encode(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                timeout=settings.CHECK_PDF_RENDER_TIMEOUT,
+            )
+        except subprocess.TimeoutExpired as error:
+            # The process is killed by `subprocess.run` on the timeout.
+            raise RenderError(
+                f"wkhtmltopdf timed out after {error.timeout} seconds."
+            ) from error
+        except OSError as error:
+            raise RenderError(
+                f"wkhtmltopdf failed to start: {error}."
+            ) from error
+
+        if result.returncode:
+            stderr = result.stderr.decode(errors="replace").strip()
+            raise RenderError(
+                f"wkhtmltopdf exited with code {result.returncode}: "
+                f"{stderr[-500:]}"
+            )
+
+        return result.stdout
+
+    def _render_many(self, htmls: list[str]) -> list[bytes | RenderError]:
+        # Every wkhtmltopdf run produces a single document, so a batch is
+        # not one invocation: its pages fan out to one process per page,
+        # up to `CHECK_PDF_RENDER_PROCESSES` processes at a time.
+        with ThreadPoolExecutor(settings.CHECK_PDF_RENDER_PROCESSES) as pool:
+            return list(pool.map(self._render_or_error, htmls))
+
+
+class WeasyPrintRenderer(BaseRenderer):
+    """
+    The renderer converts html pages in-process with WeasyPrint,
+    so no process is started per check.
+    """
+
+    def __init__(self) -> None:
+        try:
+            import weasyprint
+        except ImportError as error:
+            raise ImproperlyConfigured(
+                "WeasyPrintRenderer requires the `weasyprint` package."
+            ) from error
+
+        self.weasyprint = weasyprint
+
+    def _render(self, html: str) -> bytes:
+        try:
+            return self.weasyprint.HTML(string=html).write_pdf()
+        except Exception as error:
+            raise RenderError(f"WeasyPrint failed: {error}") from error
+
+
+@lru_cache(maxsize=None)
+def get_renderer(renderer_class: str) -> BaseRenderer:
+    """
+    The function returns the renderer of the class, created once
+    per process. The renderers hold no state between the checks,
+    so the threads of a worker process share it.
+    """
+    return import_string(renderer_class)()
@@ -0,0 +1,160 @@
+import hashlib
+import os
+import re
+from pathlib import Path
+
+from django.http import (
+    FileResponse,
+    HttpRequest,
+    HttpResponse,
+)
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_etags
+
+from check_generation_service import settings
+from check_service.documents import decompress
+from check_service.metrics import PDF_BYTES_SERVED
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeNotSatisfiable(Exception):
+    """
+    The byte range is outside of the file.
+    """
+
+
+def file_sha256(filepath: Path) -> str:
+    """
+    The function returns the sha256 hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as file:
+        while chunk := file.read(64 * 1024):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    The function returns the first & the last byte of a single byte range,
+    or `None` for a header that is not a single byte range, e.g. a multi
+    range one, which is ignored so that the whole file is served. It raises
+    `RangeNotSatisfiable` if the range is outside of the file.
+    """
+    match = RANGE_RE.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    start, end = match.groups()
+    if not start:
+        # A suffix range, i.e. the last `end` bytes of the file.
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+
+    if start > end or start >= size:
+        raise RangeNotSatisfiable(header)
+
+    return start, end
+
+
+def pdf_response(
+    request: HttpRequest, filepath: Path, name: str, etag: str
+) -> HttpResponse:
+    """
+    The function returns a pdf file with the caching headers. It answers
+    conditional requests with `304 Not Modified`, serves byte ranges, and
+    hands the file over to the web server when `CHECK_PDF_SENDFILE_HEADER`
+    is set, by its `name` in MEDIA_ROOT.
+    """
+    stat = os.stat(filepath)
+    last_modified = int(stat.st_mtime)
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+
+    if response is None and settings.CHECK_PDF_SENDFILE_HEADER:
+        # The web server reads the file & handles byte ranges itself.
+        response = HttpResponse(content_type="application/pdf")
+        response[settings.CHECK_PDF_SENDFILE_HEADER] = (
+            f"{settings.CHECK_PDF_SENDFILE_PREFIX}{name}"
+            if settings.CHECK_PDF_SENDFILE_PREFIX
+            else str(filepath)
+        )
+        PDF_BYTES_SERVED.inc(stat.st_size)
+
+    range_header = request.META.get("HTTP_RANGE")
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if (
+        response is None
+        and range_header
+        and (not if_range or parse_etags(if_range) == [etag])
+    ):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{stat.st_size}"
+            byte_range = None
+
+        # A header that is not a single byte range is ignored.
+        if byte_range is not None:
+            start, end = byte_range
+
+            with open(filepath, "rb") as file:
+                file.seek(start)
+                content = file.read(end - start + 1)
+
+            response = HttpResponse(
+                content, status=206, content_type="application/pdf"
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            PDF_BYTES_SERVED.inc(len(content))
+
+    if response is None:
+        # The WSGI server sends the file with `sendfile` when it can.
+        response = FileResponse(
+            open(filepath, "rb"), content_type="application/pdf"
+        )
+        PDF_BYTES_SERVED.inc(stat.st_size)
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    response["Cache-Control"] = "private, no-cache"
+    response["Content-Disposition"] = f"inline; filename={filepath.name}"
+
+    return response
+
+
+def document_response(
+    request: HttpRequest, document_gz: bytes, content_type: str, name: str
+) -> HttpResponse:
+    """
+    The function returns a gzipped document with the caching headers,
+    as it is stored to the clients that accept gzip & decompressed
+    to the others.
+    """
+    gzipped = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+    digest = hashlib.sha256(document_gz).hexdigest()
+    etag = f'"{digest}-gzip"' if gzipped else f'"{digest}"'
+
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if gzipped:
+            response = HttpResponse(document_gz, content_type=content_type)
+            response["Content-Encoding"] = "gzip"
+        else:
+            response = HttpResponse(
+                decompress(document_gz), content_type=content_type
+            )
+
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    response["Content-Disposition"] = f"inline; filename={name}"
+    patch_vary_headers(response, ["Accept-Encoding"])
+
+    return response
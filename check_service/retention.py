@@ -0,0 +1,156 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.core.files.storage import Storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from check_generation_service import settings
+from check_service.models import Check, CheckOrder
+
+ARCHIVE_FIELDS = (
+    "id",
+    "printer_id_id",
+    "check_type",
+    "order_id",
+    "order",
+    "status",
+    "pdf_sha256",
+    "created_at",
+)
+
+
+def archive_path(started_at: datetime) -> Path:
+    return (
+        Path(settings.CHECK_ARCHIVE_DIR)
+        / f"checks-{started_at:%Y%m%d-%H%M%S}.jsonl.gz"
+    )
+
+
+def write_archive(path: Path, checks: list[Check]) -> int:
+    """
+    The function appends the checks to a gzipped JSON lines file,
+    one gzip member per call, & returns the number of bytes written.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    size = path.stat().st_size if path.exists() else 0
+
+    with open(path, "ab") as file:
+        with gzip.GzipFile(fileobj=file, mode="wb") as archive:
+            for check in checks:
+                record = {
+                    field: getattr(check, field) for field in ARCHIVE_FIELDS
+                }
+                archive.write(
+                    json.dumps(record, cls=DjangoJSONEncoder).encode() + b"\n"
+                )
+
+        # The rows are deleted only when their archive is on the disk.
+        file.flush()
+        os.fsync(file.fileno())
+
+    return path.stat().st_size - size
+
+
+def reclaimed_size(storage: Storage, name: str) -> int:
+    """
+    The function returns the number of bytes freed by deleting the file:
+    none for a local file still hard-linked from the pdf cache.
+    """
+    try:
+        stat = os.stat(storage.path(name))
+    except NotImplementedError:
+        return storage.size(name)
+
+    return stat.st_size if stat.st_nlink == 1 else 0
+
+
+def delete_pdf_files(names: list[str]) -> tuple[int, int]:
+    """
+    The function deletes the pdf files from the storage & returns
+    the number of deleted files & the number of bytes freed.
+    """
+    storage = Check._meta.get_field("pdf_file").storage
+    files = size = 0
+
+    for name in names:
+        try:
+            file_size = reclaimed_size(storage, name)
+        except FileNotFoundError:
+            continue
+
+        storage.delete(name)
+        files += 1
+        size += file_size
+
+    return files, size
+
+
+def archive_printed_checks(days: int, chunk_size: int) -> dict[str, int | str]:
+    """
+    The function moves the printed checks older than the given number of
+    days to an archive file & deletes their pdf files, `chunk_size` checks
+    per transaction. It returns the number of archived checks, deleted pdf
+    files & reclaimed bytes.
+    """
+    started_at = timezone.now()
+    path = archive_path(started_at)
+    stats = {
+        "archive": str(path),
+        "checks": 0,
+        "pdf_files": 0,
+        "pdf_bytes": 0,
+        "order_bytes": 0,
+        "archive_bytes": 0,
+    }
+
+    checks = Check.objects.filter(
+        status=Check.StatusChoices.PRINTED,
+        created_at__lt=started_at - timedelta(days=days),
+    ).defer("document_gz")
+
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                checks.select_for_update(skip_locked=True).order_by("id")[
+                    :chunk_size
+                ]
+            )
+            if not chunk:
+                break
+
+            stats["archive_bytes"] += write_archive(path, chunk)
+            Check.objects.filter(id__in=[check.id for check in chunk]).delete()
+            # The orders without checks left can be created again.
+            order_ids = {check.order_id for check in chunk}
+            CheckOrder.objects.filter(order_id__in=order_ids).exclude(
+                order_id__in=Check.objects.filter(
+                    order_id__in=order_ids
+                ).values("order_id")
+            ).delete()
+
+        # The files are deleted once the rows that refer to them are gone.
+        # Printers of the same type share the file of an order, so the files
+        # of the checks that are not archived yet are kept.
+        names = {check.pdf_file.name for check in chunk if check.pdf_file}
+        names -= set(
+            Check.objects.filter(pdf_file__in=names).values_list(
+                "pdf_file", flat=True
+            )
+        )
+        files, size = delete_pdf_files(sorted(names))
+        stats["checks"] += len(chunk)
+        stats["pdf_files"] += files
+        stats["pdf_bytes"] += size
+        stats["order_bytes"] += sum(
+            len(json.dumps(check.order)) for check in chunk
+        )
+
+        if len(chunk) < chunk_size:
+            break
+
+    return stats
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from django.db.models import (
+    Case,
+    Count,
+    F,
+    IntegerField,
+    Q,
+    Value,
+    When,
+    Window,
+)
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from check_generation_service import settings
+from check_service.models import CheckTypeChoices, Check
+
+# The Redis broker takes the messages of priority 0 first.
+HIGHEST_PRIORITY = 0
+LOWEST_PRIORITY = 9
+
+
+def point_backlogs(printer_ids: list[int]) -> dict[int, int]:
+    """
+    The function counts the new checks waiting to be rendered
+    for each point of the printers.
+    """
+    counts = (
+        Check.objects.recent()
+        .filter(printer_id__in=printer_ids, status=Check.StatusChoices.NEW)
+        .values_list("printer_id__point_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    return dict(counts)
+
+
+def render_priority(backlog: int) -> int:
+    """
+    The function returns the priority of a rendering task for a point
+    with the given number of new checks. The checks beyond every
+    `CHECK_PDF_POINT_SHARE` checks of a point are rendered after the
+    checks of the quieter points.
+    """
+    return min(
+        HIGHEST_PRIORITY + backlog // settings.CHECK_PDF_POINT_SHARE,
+        LOWEST_PRIORITY,
+    )
+
+
+def fair_check_ids(
+    size: int, created_before: datetime | None = None
+) -> list[int]:
+    """
+    The function returns the ids of up to `size` new checks that are due
+    for rendering, taken from the points in turns, with the kitchen
+    checks of every turn first.
+    """
+    checks = Check.objects.recent()
+    if created_before is not None:
+        checks = checks.filter(created_at__lte=created_before)
+
+    return list(
+        checks.filter(
+            Q(render_after__isnull=True) | Q(render_after__lte=timezone.now()),
+            status=Check.StatusChoices.NEW,
+        )
+        .annotate(
+            turn=Window(
+                RowNumber(),
+                partition_by=F("printer_id__point_id"),
+                order_by=F("id").asc(),
+            ),
+            kitchen_last=Case(
+                When(check_type=CheckTypeChoices.KITCHEN, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            ),
+        )
+        .order_by("turn", "kitchen_last", "id")
+        .values_list("id", flat=True)[:size]
+    )
@@ -6,7 +6,14 @@ from check_service.models import Printer, Check
 class PrinterSerializer(serializers.ModelSerializer):
     class Meta:
         model = Printer
-        fields = ("id", "name", "api_key", "check_type", "point_id")
+        fields = (
+            "id",
+            "name",
+            "api_key",
+            "check_type",
+            "point_id",
+            "output_format",
+        )
 
 
 class CheckSerializer(serializers.ModelSerializer):
@@ -17,6 +24,28 @@ class CheckSerializer(serializers.ModelSerializer):
             "printer_id",
             "check_type",
             "order",
+            "order_id",
+            "total_amount_due",
+            "status",
+            "pdf_file",
+        )
+
+
+class CheckListSerializer(serializers.ModelSerializer):
+    point_id = serializers.IntegerField(
+        source="printer_id.point_id", read_only=True
+    )
+
+    class Meta:
+        model = Check
+        fields = (
+            "id",
+            "printer_id",
+            "point_id",
+            "check_type",
+            "order_id",
+            "total_amount_due",
             "status",
             "pdf_file",
+            "created_at",
         )
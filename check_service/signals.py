@@ -0,0 +1,20 @@
+from typing import Any
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from check_service.models import Printer
+from check_service.registry import printer_registry
+
+
+@receiver(post_save, sender=Printer)
+@receiver(post_delete, sender=Printer)
+def invalidate_printer_registry(**kwargs: Any) -> None:
+    """
+    The function drops the cached printers when a printer is changed.
+    """
+    printer_registry.invalidate()
+    # Drop it once more after commit, in case another process has cached
+    # the old printers before the transaction was committed.
+    transaction.on_commit(printer_registry.invalidate)
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage, Storage
+from django.core.files.utils import validate_file_name
+from django.utils.module_loading import import_string
+
+from check_generation_service import settings
+from check_service.pdf_cache import PdfCache
+
+
+def pdf_upload_to(instance: Any, filename: str) -> str:
+    """
+    The function returns the name of a pdf file in a directory sharded by
+    the hash of the file name, e.g. `pdf/3f/a2/101_client.pdf`, so that no
+    directory grows into millions of files.
+    """
+    digest = hashlib.md5(filename.encode()).hexdigest()
+    return f"pdf/{digest[:2]}/{digest[2:4]}/{filename}"
+
+
+class PdfFileSystemStorage(FileSystemStorage):
+    """
+    The storage keeps the pdf files on the local file system in MEDIA_ROOT.
+
+    A file is written to a temporary file in the same directory & renamed
+    into place, so a partially written pdf file is never served. Saving
+    a file under an existing name replaces it.
+    """
+
+    @property
+    def base_location(self) -> str:
+        return self._value_or_setting(self._location, settings.MEDIA_ROOT)
+
+    @property
+    def location(self) -> str:
+        return os.path.abspath(self.base_location)
+
+    def get_available_name(self, name: str, max_length: int = None) -> str:
+        return validate_file_name(name, allow_relative_path=True)
+
+    def _save(self, name: str, content: File) -> str:
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as file:
+            try:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            except BaseException:
+                os.remove(file.name)
+                raise
+
+        os.chmod(file.name, self.file_permissions_mode or 0o644)
+        os.replace(file.name, full_path)
+
+        return Path(name).as_posix()
+
+    def link(self, source: str | Path, name: str) -> str:
+        """
+        The method atomically hard links a local file into the storage
+        under the given name & returns the name.
+        """
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        PdfCache.link(source, full_path)
+
+        return Path(name).as_posix()
+
+
+def get_pdf_storage() -> Storage:
+    """
+    The function returns the storage of the pdf files
+    configured by `CHECK_PDF_STORAGE`.
+    """
+    try:
+        storage_class = import_string(settings.CHECK_PDF_STORAGE)
+    except ImportError as error:
+        raise ImproperlyConfigured(
+            f"The pdf storage {settings.CHECK_PDF_STORAGE} "
+            f"can not be imported: {error}"
+        ) from error
+
+    return storage_class()
@@ -1,36 +1,462 @@
+import hashlib
+import logging
+import math
 import os
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+from typing import Any
 
 from celery import shared_task
-from django.template.loader import render_to_string
+from celery.signals import worker_process_shutdown
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
 
 from check_generation_service import settings
+from check_service import partitions, retention
+from check_service.dedup import acquire_render_locks, release_render_locks
+from check_service.documents import decompress, render_html
+from check_service.metrics import (
+    PDF_CACHE_LOOKUPS,
+    RENDER_DURATION,
+    RENDER_FAILURES,
+    RENDERED_CHECKS,
+    mark_process_dead,
+)
 from check_service.models import Check
+from check_service.notifications import notify_printers
+from check_service.pdf_cache import PdfCache, pdf_cache
+from check_service.renderers import RenderError, get_renderer
+from check_service.scheduling import LOWEST_PRIORITY, fair_check_ids
+from check_service.storage import PdfFileSystemStorage, pdf_upload_to
 
+logger = logging.getLogger(__name__)
 
-@shared_task
-def generate_pdf() -> None:
+
+@worker_process_shutdown.connect
+def remove_process_metrics(**kwargs: Any) -> None:
+    """
+    The function removes the metrics of a worker process when it exits.
+    """
+    mark_process_dead(os.getpid())
+
+
+def fail_checks(failures: list[tuple[Check, RenderError]]) -> None:
+    """
+    The function schedules the next render attempt of the checks that
+    failed to render, `CHECK_PDF_RETRY_DELAY` seconds after the first
+    failure & twice as long after each next one. The checks that failed
+    `CHECK_PDF_RENDER_MAX_ATTEMPTS` times are marked as failed, so that
+    they are not picked up again.
+    """
+    now = timezone.now()
+    retries = defaultdict(list)
+
+    for check, error in failures:
+        check.render_attempts += 1
+        check.render_error = str(error)
+
+        if check.render_attempts >= settings.CHECK_PDF_RENDER_MAX_ATTEMPTS:
+            check.status = Check.StatusChoices.FAILED
+            check.render_after = None
+            logger.error(
+                "Check %d failed to render %d times: %s",
+                check.id,
+                check.render_attempts,
+                error,
+            )
+            continue
+
+        delay = settings.CHECK_PDF_RETRY_DELAY * 2 ** (
+            check.render_attempts - 1
+        )
+        check.render_after = now + timedelta(seconds=delay)
+        retries[delay, check.check_type].append(check.id)
+        logger.warning(
+            "Check %d failed to render, retrying in %ds: %s",
+            check.id,
+            delay,
+            error,
+        )
+
+    Check.objects.bulk_update(
+        [check for check, _ in failures],
+        ["status", "render_attempts", "render_error", "render_after"],
+    )
+    RENDER_FAILURES.inc(len(failures))
+
+    # In the batch mode, the periodic task picks the checks up once
+    # their `render_after` has passed. Otherwise, the retries are queued
+    # behind the new checks of their type.
+    if not settings.CHECK_PDF_BATCH_RENDERING:
+        for (delay, check_type), check_ids in retries.items():
+            transaction.on_commit(
+                partial(
+                    generate_pdf.apply_async,
+                    (check_ids,),
+                    {"check_type": check_type},
+                    countdown=delay,
+                    priority=LOWEST_PRIORITY,
+                )
+            )
+
+
+def claim_timeout(count: int) -> float:
+    """
+    The function returns the number of seconds a batch of checks is claimed
+    for: `CHECK_LOCK_TIMEOUT` seconds on top of the longest time its pages
+    take to convert by `CHECK_PDF_RENDER_PROCESSES` parallel processes,
+    so that a slow batch is not taken over while it is still rendered.
     """
-    The task converts a html page to a pdf page.
+    rounds = math.ceil(count / settings.CHECK_PDF_RENDER_PROCESSES)
+
+    return (
+        settings.CHECK_LOCK_TIMEOUT
+        + rounds * settings.CHECK_PDF_RENDER_TIMEOUT
+    )
+
+
+def claim_new_checks(check_ids: list[int]) -> list[Check]:
     """
-    checks = Check.objects.all()
+    The function claims the new checks of the list that are due for
+    rendering in a short transaction & returns them. The other tasks skip
+    a claimed check until it is rendered or its claim expires after
+    `claim_timeout` seconds, so no transaction is held open while
+    the checks are rendered.
+    """
+    now = timezone.now()
+    claimed_until = now + timedelta(seconds=claim_timeout(len(check_ids)))
+
+    with transaction.atomic():
+        checks = list(
+            Check.objects.recent()
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(render_after__isnull=True) | Q(render_after__lte=now),
+                id__in=check_ids,
+                status=Check.StatusChoices.NEW,
+            )
+            .order_by("id")
+        )
+        Check.objects.filter(id__in=[check.id for check in checks]).update(
+            render_after=claimed_until
+        )
 
     for check in checks:
-        order_id = check.order["order_id"]
-        check_type = check.check_type
-        dishes = check.order["dishes"]
-        filename = f"{order_id}_{check_type}.pdf"
-        filepath = os.path.join(settings.MEDIA_ROOT, "pdf", filename)
-        total_amount_due = sum(dish["total_price"] for dish in dishes)
-
-        html = render_to_string(
-            "check.html",
-            {"check": check, "total_amount_due": total_amount_due},
+        check.render_after = claimed_until
+
+    return checks
+
+
+def owned_checks(checks: list[Check]) -> list[Check]:
+    """
+    The function locks the claimed checks in the current transaction
+    & returns the ones whose claim was not taken over by another task
+    after it expired.
+    """
+    claims = dict(
+        Check.objects.recent()
+        .select_for_update()
+        .filter(
+            id__in=[check.id for check in checks],
+            status=Check.StatusChoices.NEW,
+        )
+        .values_list("id", "render_after")
+    )
+
+    return [
+        check for check in checks if claims.get(check.id) == check.render_after
+    ]
+
+
+def render_checks(checks: list[Check]) -> dict[str, float]:
+    """
+    The function converts the claimed checks to pdf files in a single
+    renderer call outside of a transaction, then marks them as rendered
+    with one query in a short one.
+    A local pdf file is written under a name of its own & hard linked
+    to the name of the check in that transaction, only if the check is
+    still claimed by the task, so that a task whose claim expired never
+    replaces or deletes the file of the task that took the check over.
+    The checks that fail to render are left to `fail_checks`.
+    It returns the number of rendered & failed checks, and the time
+    spent on rendering the html & pdf pages.
+    """
+    started_at = time.perf_counter()
+
+    htmls = []
+    for check in checks:
+        if check.document_gz:
+            # The html page was rendered when the check was created.
+            htmls.append(decompress(check.document_gz).decode())
+        else:
+            htmls.append(render_html(check))
+
+    template_seconds = time.perf_counter() - started_at
+
+    storage = Check._meta.get_field("pdf_file").storage
+    # Cached pdf files are hard linked, so only a local storage uses them.
+    local = isinstance(storage, PdfFileSystemStorage)
+    use_cache = pdf_cache.enabled and local
+
+    keys = [PdfCache.key(html) for html in htmls]
+    cached = {}
+    pdfs = {}
+    if use_cache:
+        for key in set(keys):
+            if entry := pdf_cache.get(key):
+                cached[key], pdfs[key] = entry
+                PDF_CACHE_LOOKUPS.labels("hit").inc()
+            else:
+                PDF_CACHE_LOOKUPS.labels("miss").inc()
+
+    # Identical pages of the batch are rendered only once.
+    pages = {key: html for key, html in zip(keys, htmls) if key not in cached}
+    errors = {}
+    started_at = time.perf_counter()
+    if pages:
+        renderer = get_renderer(settings.CHECK_PDF_RENDERER)
+        results = renderer.render_many(list(pages.values()))
+
+        for key, result in zip(pages, results):
+            if isinstance(result, RenderError):
+                errors[key] = result
+            else:
+                pdfs[key] = result
+
+    pdf_seconds = time.perf_counter() - started_at
+
+    rendered = [
+        (check, key) for check, key in zip(checks, keys) if key not in errors
+    ]
+
+    digests = {
+        key: hashlib.sha256(pdf).hexdigest() for key, pdf in pdfs.items()
+    }
+
+    # The local pdf files of the task are staged under its own names.
+    token = uuid.uuid4().hex
+    sources = dict(cached)
+    staged = []
+    for check, key in rendered:
+        filename = f"{check.order['order_id']}_{check.check_type}.pdf"
+        check.pdf_file.name = pdf_upload_to(check, filename)
+        check.pdf_sha256 = digests[key]
+
+        if not local:
+            # A remote storage is written to right away & its file is left
+            # in place for the task that takes the check over, if any.
+            check.pdf_file.name = storage.save(
+                check.pdf_file.name, ContentFile(pdfs[key])
+            )
+        elif key not in sources:
+            name = storage.save(
+                f"pdf/{key}.{token}.tmp", ContentFile(pdfs[key])
+            )
+            staged.append(name)
+            sources[key] = storage.path(name)
+
+            if use_cache:
+                pdf_cache.put(key, sources[key])
+
+    if use_cache and len(sources) > len(cached):
+        # The cache is measured once per batch.
+        pdf_cache.evict()
+
+    try:
+        with transaction.atomic():
+            owned_ids = {check.id for check in owned_checks(checks)}
+
+            failures = [
+                (check, errors[key])
+                for check, key in zip(checks, keys)
+                if key in errors and check.id in owned_ids
+            ]
+            if failures:
+                fail_checks(failures)
+
+            checks = []
+            for check, key in rendered:
+                if check.id not in owned_ids:
+                    # The claim expired & another task renders the check.
+                    continue
+
+                if local:
+                    try:
+                        storage.link(sources[key], check.pdf_file.name)
+                    except FileNotFoundError:
+                        # The cached file was evicted after it was read,
+                        # so the check gets a new file with its content.
+                        storage.save(
+                            check.pdf_file.name, ContentFile(pdfs[key])
+                        )
+
+                check.status = Check.StatusChoices.RENDERED
+                check.render_after = None
+                check.document_gz = None
+                checks.append(check)
+
+            Check.objects.bulk_update(
+                checks,
+                [
+                    "pdf_file",
+                    "pdf_sha256",
+                    "status",
+                    "render_after",
+                    "document_gz",
+                ],
+            )
+            if checks:
+                transaction.on_commit(
+                    partial(
+                        notify_printers,
+                        [check.printer_id_id for check in checks],
+                    )
+                )
+    finally:
+        for name in staged:
+            storage.delete(name)
+
+    RENDERED_CHECKS.inc(len(checks))
+    RENDER_DURATION.labels("template").observe(template_seconds)
+    RENDER_DURATION.labels("pdf").observe(pdf_seconds)
+    logger.info(
+        "Rendered %d checks: %.3fs of html, %.3fs of pdf.",
+        len(checks),
+        template_seconds,
+        pdf_seconds,
+    )
+
+    return {
+        "checks": len(checks),
+        "failed": len(failures),
+        "template_seconds": template_seconds,
+        "pdf_seconds": pdf_seconds,
+    }
+
+
+def render_claimed_checks(checks: list[Check]) -> dict[str, float]:
+    """
+    The function renders the claimed checks. When the rendering fails
+    as a whole, every check still claimed counts a failed attempt, so that
+    a batch that keeps breaking the task gets the failed status in the end
+    instead of being picked up again forever.
+    """
+    try:
+        return render_checks(checks)
+    except Exception as error:
+        with transaction.atomic():
+            checks = owned_checks(checks)
+            for check in checks:
+                # The rendered status may be set on a check
+                # whose update was rolled back.
+                check.status = Check.StatusChoices.NEW
+
+            if checks:
+                render_error = RenderError(f"The rendering failed: {error!r}")
+                fail_checks([(check, render_error) for check in checks])
+        raise
+
+
+@shared_task
+def generate_pdf(
+    check_ids: list[int], check_type: str | None = None
+) -> dict[str, float]:
+    """
+    The task converts a html page to a pdf page
+    for each new check from the given list of check ids.
+    The check type of the checks routes the task to its queue.
+    When the task fails for another reason than a bad page, its checks
+    count a failed attempt & are retried by `fail_checks` like the checks
+    with a bad page, so that `CHECK_PDF_RENDER_MAX_ATTEMPTS` caps all the
+    attempts. The checks of a task that could not count its attempts are
+    swept up by `generate_pending_pdfs` once their claim expires.
+
+    The checks already locked by another task are skipped without
+    a query, so that duplicate deliveries of the task are cheap. If the
+    task holding them dies, `generate_pending_pdfs` sweeps them up once
+    their claim expires.
+    """
+    token = uuid.uuid4().hex
+    locked_ids = acquire_render_locks(check_ids, token)
+
+    stats = {"checks": 0, "failed": 0, "template_seconds": 0, "pdf_seconds": 0}
+    if not locked_ids:
+        return stats
+
+    try:
+        checks = claim_new_checks(locked_ids)
+        if checks:
+            stats = render_claimed_checks(checks)
+    finally:
+        release_render_locks(locked_ids, token)
+
+    return stats
+
+
+@shared_task
+def generate_pending_pdfs(min_age: float = 0) -> dict[str, float]:
+    """
+    The task converts all new checks that are not waiting for a retry
+    & were created at least `min_age` seconds ago to pdf pages in batches
+    of `CHECK_PDF_BATCH_SIZE` checks, taken from the points in turns.
+    """
+    stats = {"checks": 0, "failed": 0, "template_seconds": 0, "pdf_seconds": 0}
+    created_before = timezone.now() - timedelta(seconds=min_age)
+
+    while True:
+        # Row locks can not be taken along with the window function
+        # that orders the checks, so they are taken on the picked ids.
+        checks = claim_new_checks(
+            fair_check_ids(settings.CHECK_PDF_BATCH_SIZE, created_before)
+        )
+        if checks:
+            for key, value in render_claimed_checks(checks).items():
+                stats[key] += value
+
+        if len(checks) < settings.CHECK_PDF_BATCH_SIZE:
+            return stats
+
+
+@shared_task
+def archive_printed_checks() -> dict[str, int | str]:
+    """
+    The task archives the printed checks older than `CHECK_RETENTION_DAYS`
+    days & deletes their pdf files.
+    """
+    if not settings.CHECK_RETENTION_DAYS:
+        return {"checks": 0}
+
+    stats = retention.archive_printed_checks(
+        settings.CHECK_RETENTION_DAYS, settings.CHECK_RETENTION_CHUNK_SIZE
+    )
+    logger.info(
+        "Archived %d checks to %s, reclaimed %d bytes of %d pdf files "
+        "& %d bytes of orders.",
+        stats["checks"],
+        stats["archive"],
+        stats["pdf_bytes"],
+        stats["pdf_files"],
+        stats["order_bytes"],
+    )
+
+    return stats
+
+
+@shared_task
+def create_check_partitions() -> list[str]:
+    """
+    The task creates the partitions of the check table
+    for the next `CHECK_PARTITIONS_AHEAD` months.
+    """
+    if not partitions.is_partitioned():
+        return []
+
+    with transaction.atomic():
+        return partitions.create_partitions(
+            timezone.now().date(), settings.CHECK_PARTITIONS_AHEAD
         )
-        cmd = f"wkhtmltopdf - - > {filepath}"
-        process = os.popen(cmd, "w")
-        process.write(html)
-        process.close()
-
-        check.pdf_file.name = os.path.join("pdf", filename)
-        check.status = Check.StatusChoices.RENDERED
-        check.save()
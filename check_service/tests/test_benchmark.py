@@ -0,0 +1,73 @@
+import tempfile
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, TransactionTestCase
+
+from check_generation_service import settings
+from check_service.benchmark import (
+    FIRST_ORDER_ID,
+    Benchmark,
+    percentiles,
+    synthetic_orders,
+)
+from check_service.models import Printer, Check, CheckOrder
+
+
+class BenchmarkHelpersTests(SimpleTestCase):
+    def test_percentiles(self) -> None:
+        report = percentiles([number / 1000 for number in range(1, 101)])
+
+        self.assertEqual(report["count"], 100)
+        self.assertAlmostEqual(report["p50"], 50.5)
+        self.assertAlmostEqual(report["p99"], 99.01)
+        self.assertAlmostEqual(report["max"], 100)
+        self.assertEqual(percentiles([]), {"count": 0})
+
+    def test_synthetic_orders(self) -> None:
+        orders = synthetic_orders(10, [7, 8], seed=1)
+
+        self.assertEqual(orders, synthetic_orders(10, [7, 8], seed=1))
+        self.assertEqual(
+            [order["order_id"] for order in orders],
+            list(range(FIRST_ORDER_ID + 1, FIRST_ORDER_ID + 11)),
+        )
+        for order in orders:
+            self.assertIn(order["point_id"], [7, 8])
+            self.assertTrue(order["dishes"])
+
+
+class BenchmarkTests(TransactionTestCase):
+    def test_run(self) -> None:
+        with (
+            tempfile.TemporaryDirectory() as media_root,
+            patch.object(settings, "MEDIA_ROOT", media_root),
+            patch("check_service.tasks.pdf_cache.max_size", 0),
+            patch("check_service.tasks.get_renderer") as mock_get_renderer,
+        ):
+            renderer = mock_get_renderer.return_value
+            renderer.render_many.side_effect = lambda htmls: [
+                b"%PDF-1.4" for _ in htmls
+            ]
+            # The second run reuses the order ids freed by the first one.
+            reports = [
+                Benchmark(
+                    orders=5,
+                    points=2,
+                    concurrency=2,
+                    eager=True,
+                    poll_wait=0.1,
+                    timeout=30,
+                    seed=0,
+                ).run()
+                for _ in range(2)
+            ]
+
+        report = reports[1]
+        self.assertEqual(report["errors"], 0)
+        self.assertEqual(report["checks"], {"expected": 10, "printed": 10})
+        self.assertEqual(report["latency_ms"]["create"]["count"], 5)
+        self.assertEqual(report["latency_ms"]["order_to_print"]["count"], 10)
+        self.assertEqual(report["render"]["checks"], 10)
+        self.assertFalse(Printer.objects.exists())
+        self.assertFalse(Check.objects.exists())
+        self.assertFalse(CheckOrder.objects.exists())
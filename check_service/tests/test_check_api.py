@@ -1,17 +1,25 @@
 import json
-from unittest.mock import patch
+from contextlib import contextmanager
+from typing import Callable, Iterator
+from unittest.mock import call, patch
 
+from django.core.cache import cache
+from kombu.exceptions import OperationalError
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 
 from rest_framework.test import APIClient
 
-from check_service.models import Printer, Check
-from check_service.serializers import CheckSerializer
+from check_generation_service import settings
+from check_service.documents import ESCPOS_INIT, decompress
+from check_service.models import Printer, Check, CheckOrder
+from check_service.serializers import CheckSerializer, CheckListSerializer
 
 
 CHECK_LIST_URL = reverse("check_service:check-list")
+CHECK_BULK_URL = reverse("check_service:check-bulk")
+ORDER_CREATE_URL = reverse("check_service:order-create")
 
 
 class CheckApiTests(TestCase):
@@ -49,6 +57,7 @@ class CheckApiTests(TestCase):
             ],
         }
         self.order_json = json.dumps(self.order)
+        CheckOrder.objects.create(order_id=self.order["order_id"])
         self.first_check = Check.objects.create(
             printer_id=self.first_printer,
             check_type=self.first_printer.check_type,
@@ -62,12 +71,56 @@ class CheckApiTests(TestCase):
 
     def test_list_checks(self) -> None:
         response = self.client.get(CHECK_LIST_URL)
-        checks = Check.objects.all()
-        serializer = CheckSerializer(checks, many=True)
+        checks = Check.objects.order_by("id")
+        serializer = CheckListSerializer(checks, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data["results"], serializer.data)
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertNotIn("order", response.data["results"][0])
+
+    def test_list_checks_with_orders(self) -> None:
+        response = self.client.get(CHECK_LIST_URL, {"include": "order"})
+        serializer = CheckSerializer(Check.objects.order_by("id"), many=True)
+
+        self.assertEqual(response.data["results"], serializer.data)
+
+    def test_list_checks_pages(self) -> None:
+        response = self.client.get(CHECK_LIST_URL, {"page_size": 1})
+
+        self.assertEqual(
+            [check["id"] for check in response.data["results"]],
+            [self.first_check.id],
+        )
+
+        response = self.client.get(response.data["next"])
+
+        self.assertEqual(
+            [check["id"] for check in response.data["results"]],
+            [self.second_check.id],
+        )
+        self.assertIsNone(response.data["next"])
+
+    def test_list_checks_filters(self) -> None:
+        Check.objects.filter(id=self.second_check.id).update(
+            status=Check.StatusChoices.RENDERED
+        )
+
+        for params, checks in (
+            ({"status": "rendered"}, [self.second_check]),
+            ({"printer_id": self.first_printer.id}, [self.first_check]),
+            ({"point_id": 2}, []),
+        ):
+            response = self.client.get(CHECK_LIST_URL, params)
+
+            self.assertEqual(
+                [check["id"] for check in response.data["results"]],
+                [check.id for check in checks],
+            )
+
+        response = self.client.get(CHECK_LIST_URL, {"point_id": "first"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
     def test_create_check_missing_order_id(self) -> None:
         payload = {
@@ -173,13 +226,272 @@ class CheckApiTests(TestCase):
                 ],
             },
         }
-        with patch(
-            "check_service.tasks.generate_pdf.delay"
-        ) as mock_generate_pdf:
+        with (
+            patch(
+                "check_service.tasks.generate_pdf.apply_async"
+            ) as mock_generate_pdf,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            response = self.client.post(CHECK_LIST_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data["checks"]), 2)
+
+        self.assertCountEqual(
+            mock_generate_pdf.call_args_list,
+            [
+                call(
+                    ([check.id],), {"check_type": check.check_type}, priority=0
+                )
+                for check in Check.objects.filter(order_id=127)
+            ],
+        )
+        self.assertEqual(Check.objects.filter(order__order_id=127).count(), 2)
+
+    def test_create_check_for_document_printers(self) -> None:
+        Printer.objects.filter(id=self.first_printer.id).update(
+            output_format="html"
+        )
+        Printer.objects.filter(id=self.second_printer.id).update(
+            output_format="escpos"
+        )
+        payload = {"order": {**self.order, "order_id": 127}}
+        with (
+            patch(
+                "check_service.tasks.generate_pdf.apply_async"
+            ) as mock_generate_pdf,
+            patch("check_service.views.notify_printers") as mock_notify,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
             response = self.client.post(CHECK_LIST_URL, payload, format="json")
 
-            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
-            self.assertEqual(mock_generate_pdf.call_count, 2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        mock_generate_pdf.assert_not_called()
+        mock_notify.assert_called_once()
+
+        checks = Check.objects.filter(order_id=127)
+        self.assertEqual(
+            {check.status for check in checks},
+            {Check.StatusChoices.RENDERED},
+        )
+        documents = {
+            check.check_type: decompress(check.document_gz) for check in checks
+        }
+        self.assertIn(b"Maria Hernandez", documents["client"])
+        self.assertTrue(documents["kitchen"].startswith(ESCPOS_INIT))
+        self.assertIn(b"Pizza", documents["kitchen"])
+
+    def test_create_check_renders_html_at_ingestion(self) -> None:
+        payload = {"order": {**self.order, "order_id": 127}}
+        with (
+            patch.object(settings, "CHECK_HTML_AT_INGESTION", True),
+            patch("check_service.tasks.generate_pdf.apply_async"),
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            self.client.post(CHECK_LIST_URL, payload, format="json")
+
+        for check in Check.objects.filter(order_id=127):
+            self.assertEqual(check.status, Check.StatusChoices.NEW)
+            self.assertIn(b"<td>Pizza</td>", decompress(check.document_gz))
+
+    def test_create_check_for_existing_order(self) -> None:
+        payload = {"order": {**self.order, "order_id": 127}}
+        with patch("check_service.tasks.generate_pdf.delay"):
+            self.client.post(CHECK_LIST_URL, payload, format="json")
+            response = self.client.post(CHECK_LIST_URL, payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["message"], "Checks for order: 127 already exist."
+        )
+        self.assertEqual(Check.objects.filter(order_id=127).count(), 2)
+
+    def test_create_check_for_existing_order_at_another_point(self) -> None:
+        Printer.objects.create(
+            name="HP ScanJet Pro 4000",
+            api_key="0d7c3f4b-5a0e-4b8e-9d1b-3f0f1c1e2a77",
+            check_type="client",
+            point_id=2,
+        )
+        payload = {"order": {**self.order, "point_id": 2}}
+
+        with patch("check_service.tasks.generate_pdf.apply_async"):
+            response = self.client.post(CHECK_LIST_URL, payload, format="json")
+            bulk_response = self.client.post(
+                CHECK_BULK_URL, [payload], format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.data["message"], "Checks for order: 101 already exist."
+        )
+        self.assertEqual(
+            bulk_response.data["orders"][0]["status"], "duplicate"
+        )
+        self.assertFalse(Check.objects.filter(printer_id__point_id=2).exists())
+
+    def test_bulk_create_checks(self) -> None:
+        CheckOrder.objects.create(order_id=130)
+        Check.objects.create(
+            printer_id=self.first_printer,
+            check_type=self.first_printer.check_type,
+            order={**self.order, "order_id": 130},
+        )
+        payload = [
+            {"order": {**self.order, "order_id": 128}},
+            {**self.order, "order_id": 129},
+            {**self.order, "order_id": 128},
+            {**self.order, "order_id": 130},
+            {**self.order, "order_id": 131, "point_id": 7},
+            {**self.order, "order_id": None},
+        ]
+        with (
+            patch(
+                "check_service.tasks.generate_pdf.apply_async"
+            ) as mock_generate_pdf,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            response = self.client.post(CHECK_BULK_URL, payload, format="json")
+
+        results = response.data["orders"]
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in results],
+            [
+                "created",
+                "created",
+                "duplicate",
+                "duplicate",
+                "invalid",
+                "invalid",
+            ],
+        )
+        self.assertEqual(results[5]["message"], "Order id is missing.")
+        check_ids = results[0]["checks"] + results[1]["checks"]
+        self.assertEqual(len(check_ids), 4)
+        self.assertCountEqual(
+            [
+                (task_call.args[0][0], task_call.args[1]["check_type"])
+                for task_call in mock_generate_pdf.call_args_list
+            ],
+            [
+                (
+                    list(
+                        Check.objects.filter(
+                            id__in=check_ids, check_type=check_type
+                        )
+                        .order_by("id")
+                        .values_list("id", flat=True)
+                    ),
+                    check_type,
+                )
+                for check_type in ("client", "kitchen")
+            ],
+        )
+
+    def test_bulk_create_checks_from_ndjson(self) -> None:
+        payload = "\n".join(
+            json.dumps({**self.order, "order_id": order_id})
+            for order_id in (128, 129)
+        )
+        with patch("check_service.tasks.generate_pdf.delay"):
+            response = self.client.post(
+                CHECK_BULK_URL,
+                payload,
+                content_type="application/x-ndjson",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [result["status"] for result in response.data["orders"]],
+            ["created", "created"],
+        )
+        self.assertEqual(Check.objects.count(), 6)
+
+    def test_print_checks(self) -> None:
+        print_checks_url = reverse(
+            "check_service:check-print-checks",
+            kwargs={"api_key": self.first_printer.api_key},
+        )
+        rendered_checks = [
+            Check.objects.create(
+                printer_id=self.first_printer,
+                check_type=self.first_printer.check_type,
+                order={**self.order, "order_id": order_id},
+                status=Check.StatusChoices.RENDERED,
+            )
+            for order_id in (128, 129, 130)
+        ]
+
+        with patch.object(settings, "CHECK_PRINT_BATCH_SIZE", 2):
+            first_response = self.client.get(print_checks_url)
+            second_response = self.client.get(print_checks_url)
+            third_response = self.client.get(print_checks_url)
+
+        self.assertEqual(first_response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [check["id"] for check in first_response.data],
+            [check.id for check in rendered_checks[:2]],
+        )
+        self.assertEqual(
+            {check["status"] for check in first_response.data}, {"printed"}
+        )
+        self.assertEqual(
+            [check["id"] for check in second_response.data],
+            [rendered_checks[2].id],
+        )
+        self.assertEqual(third_response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(
+            Check.objects.filter(status=Check.StatusChoices.PRINTED).count(),
+            3,
+        )
+
+    def test_print_checks_waits_for_rendered_checks(self) -> None:
+        print_checks_url = reverse(
+            "check_service:check-print-checks",
+            kwargs={"api_key": self.first_printer.api_key},
+        )
+        waits = []
+
+        @contextmanager
+        def subscribe(printer_id: int) -> Iterator[Callable[[float], bool]]:
+            def wait_for_checks(timeout: float) -> bool:
+                waits.append(timeout)
+                self.first_check.status = Check.StatusChoices.RENDERED
+                self.first_check.save()
+                return True
+
+            yield wait_for_checks
+
+        with patch("check_service.views.subscribe", subscribe):
+            response = self.client.get(print_checks_url, {"wait": 60})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [check["id"] for check in response.data], [self.first_check.id]
+        )
+        self.assertEqual(len(waits), 1)
+        self.assertLessEqual(waits[0], settings.CHECK_LONG_POLL_MAX_WAIT)
+
+    def test_print_checks_invalid_wait(self) -> None:
+        print_checks_url = reverse(
+            "check_service:check-print-checks",
+            kwargs={"api_key": self.first_printer.api_key},
+        )
+        response = self.client.get(print_checks_url, {"wait": "soon"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_print_checks_unknown_printer(self) -> None:
+        print_checks_url = reverse(
+            "check_service:check-print-checks", kwargs={"api_key": "unknown"}
+        )
+        response = self.client.get(print_checks_url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(
+            response.data["message"], "There are no available printers."
+        )
 
     def test_retrieve_check(self) -> None:
         check_detail_url = reverse(
@@ -245,3 +557,158 @@ class CheckApiTests(TestCase):
         self.assertFalse(
             Check.objects.filter(pk=self.second_check.pk).exists()
         )
+
+    def test_create_check_with_idempotency_key(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+        payload = {"order": {**self.order, "order_id": 127}}
+
+        with patch("check_service.tasks.generate_pdf.apply_async"):
+            first_response = self.client.post(
+                CHECK_LIST_URL,
+                payload,
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="order-127",
+            )
+            with self.assertNumQueries(0):
+                second_response = self.client.post(
+                    CHECK_LIST_URL,
+                    payload,
+                    format="json",
+                    HTTP_IDEMPOTENCY_KEY="order-127",
+                )
+
+        self.assertEqual(first_response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second_response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second_response.data, first_response.data)
+        self.assertEqual(second_response["Idempotent-Replayed"], "true")
+        self.assertEqual(Check.objects.filter(order_id=127).count(), 2)
+
+    def test_create_check_with_reused_idempotency_key(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        with patch("check_service.tasks.generate_pdf.apply_async"):
+            for order_id in (127, 128):
+                response = self.client.post(
+                    CHECK_LIST_URL,
+                    {"order": {**self.order, "order_id": order_id}},
+                    format="json",
+                    HTTP_IDEMPOTENCY_KEY="order",
+                )
+
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+        self.assertFalse(Check.objects.filter(order_id=128).exists())
+
+    async def test_create_order_checks_async(self) -> None:
+        payload = {"order": {**self.order, "order_id": 127}}
+
+        # The checks are saved in another thread than the one of the test,
+        # so its on commit callbacks are run right away.
+        with (
+            patch(
+                "check_service.tasks.generate_pdf.apply_async"
+            ) as mock_generate_pdf,
+            patch(
+                "check_service.views.transaction.on_commit",
+                side_effect=lambda callback: callback(),
+            ),
+        ):
+            response = await self.async_client.post(
+                ORDER_CREATE_URL, payload, content_type="application/json"
+            )
+        second_response = await self.async_client.post(
+            ORDER_CREATE_URL, payload, content_type="application/json"
+        )
+        checks = [check async for check in Check.objects.filter(order_id=127)]
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            sorted(check["id"] for check in response.json()["checks"]),
+            sorted(check.id for check in checks),
+        )
+        self.assertCountEqual(
+            mock_generate_pdf.call_args_list,
+            [
+                call(
+                    ([check.id],), {"check_type": check.check_type}, priority=0
+                )
+                for check in checks
+            ],
+        )
+        self.assertEqual(
+            second_response.status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            second_response.json()["message"],
+            "Checks for order: 127 already exist.",
+        )
+
+    async def test_create_order_checks_async_with_idempotency_key(
+        self,
+    ) -> None:
+        await cache.aclear()
+        self.addCleanup(cache.clear)
+
+        with patch("check_service.tasks.generate_pdf.apply_async"):
+            responses = [
+                await self.async_client.post(
+                    ORDER_CREATE_URL,
+                    {"order": {**self.order, "order_id": order_id}},
+                    content_type="application/json",
+                    # The async client of Django 4.1 takes the raw headers.
+                    **{"idempotency-key": "order-127"},
+                )
+                for order_id in (127, 127, 128)
+            ]
+
+        self.assertEqual(responses[0].status_code, status.HTTP_201_CREATED)
+        self.assertEqual(responses[1].status_code, status.HTTP_201_CREATED)
+        self.assertEqual(responses[1].json(), responses[0].json())
+        self.assertEqual(responses[1]["Idempotent-Replayed"], "true")
+        self.assertEqual(
+            responses[2].status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertEqual(await Check.objects.filter(order_id=127).acount(), 2)
+        self.assertFalse(await Check.objects.filter(order_id=128).aexists())
+
+    async def test_create_order_checks_async_with_broker_down(self) -> None:
+        payload = {"order": {**self.order, "order_id": 127}}
+
+        with (
+            patch(
+                "check_service.tasks.generate_pdf.apply_async",
+                side_effect=OperationalError("The broker is down."),
+            ),
+            patch(
+                "check_service.views.transaction.on_commit",
+                side_effect=lambda callback: callback(),
+            ),
+            self.assertLogs("check_service.views", "ERROR"),
+        ):
+            response = await self.async_client.post(
+                ORDER_CREATE_URL, payload, content_type="application/json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            await Check.objects.filter(
+                order_id=127, status=Check.StatusChoices.NEW
+            ).acount(),
+            2,
+        )
+
+    async def test_create_order_checks_async_without_point_id(self) -> None:
+        response = await self.async_client.post(
+            ORDER_CREATE_URL,
+            {"order": {"order_id": 127}},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            response.json()["message"], "Point id is missing from the order."
+        )
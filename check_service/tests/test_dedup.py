@@ -0,0 +1,50 @@
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCache
+from django.test import SimpleTestCase
+
+from check_generation_service import settings
+from check_service.dedup import (
+    RELEASE_LOCKS_SCRIPT,
+    acquire_render_locks,
+    release_render_locks,
+)
+
+
+class RenderLocksTests(SimpleTestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_locks_are_released_only_by_their_task(self) -> None:
+        self.assertEqual(acquire_render_locks([1, 2], "first-task"), [1, 2])
+        self.assertEqual(acquire_render_locks([2, 3], "second-task"), [3])
+
+        release_render_locks([1, 2, 3], "second-task")
+
+        self.assertEqual(acquire_render_locks([1, 2, 3], "third-task"), [3])
+
+    def test_redis_locks_take_one_round_trip(self) -> None:
+        backend = MagicMock(spec=RedisCache)
+        backend.make_and_validate_key.side_effect = lambda key: f":1:{key}"
+        client = backend._cache.get_client.return_value
+        pipeline = client.pipeline.return_value.__enter__.return_value
+        pipeline.execute.return_value = [True, None]
+
+        with patch("check_service.dedup.caches", {"default": backend}):
+            locked_ids = acquire_render_locks([1, 2], "task")
+            release_render_locks(locked_ids, "task")
+
+        self.assertEqual(locked_ids, [1])
+        self.assertEqual(pipeline.set.call_count, 2)
+        pipeline.set.assert_any_call(
+            ":1:check_service:render-lock:1",
+            "task",
+            nx=True,
+            ex=settings.CHECK_LOCK_TIMEOUT,
+        )
+        pipeline.execute.assert_called_once()
+        client.eval.assert_called_once_with(
+            RELEASE_LOCKS_SCRIPT, 1, ":1:check_service:render-lock:1", "task"
+        )
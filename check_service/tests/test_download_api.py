@@ -0,0 +1,219 @@
+import hashlib
+import io
+import tempfile
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from check_generation_service import settings
+from check_service.documents import compress
+from check_service.models import Printer, Check
+
+PDF = b"%PDF-1.4 check for order 101"
+
+
+class DownloadCheckApiTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.media_root = tempfile.TemporaryDirectory()
+        media_root_patcher = patch.object(
+            settings, "MEDIA_ROOT", Path(self.media_root.name)
+        )
+        media_root_patcher.start()
+        self.addCleanup(media_root_patcher.stop)
+        self.addCleanup(self.media_root.cleanup)
+
+        (Path(self.media_root.name) / "pdf").mkdir()
+        (Path(self.media_root.name) / "pdf" / "101_client.pdf").write_bytes(
+            PDF
+        )
+        printer = Printer.objects.create(
+            name="HP ScanJet Pro 2000",
+            api_key="bcc65a51-953c-4538-8c84-662868ab4edc",
+            check_type="client",
+            point_id=1,
+        )
+        self.check = Check.objects.create(
+            printer_id=printer,
+            check_type=printer.check_type,
+            order={"order_id": 101, "point_id": 1, "dishes": []},
+            status=Check.StatusChoices.PRINTED,
+            pdf_file="pdf/101_client.pdf",
+            pdf_sha256=hashlib.sha256(PDF).hexdigest(),
+        )
+        self.etag = f'"{self.check.pdf_sha256}"'
+        self.url = reverse(
+            "check_service:download-check",
+            kwargs={"check_id": self.check.id},
+        )
+
+    def test_download_check(self) -> None:
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), PDF)
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertIn("Last-Modified", response)
+
+    def test_download_check_without_digest(self) -> None:
+        Check.objects.filter(id=self.check.id).update(pdf_sha256="")
+
+        response = self.client.get(self.url)
+        with patch("check_service.views.file_sha256") as mock_file_sha256:
+            second_response = self.client.get(self.url)
+
+        self.assertEqual(response["ETag"], self.etag)
+        self.assertEqual(second_response["ETag"], self.etag)
+        mock_file_sha256.assert_not_called()
+        self.check.refresh_from_db()
+        self.assertEqual(
+            self.check.pdf_sha256, hashlib.sha256(PDF).hexdigest()
+        )
+
+    def test_download_check_not_modified(self) -> None:
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=self.etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b"")
+
+    def test_download_check_range(self) -> None:
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-7")
+
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(response.content, PDF[:8])
+        self.assertEqual(response["Content-Range"], f"bytes 0-7/{len(PDF)}")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+
+        self.assertEqual(response.content, PDF[-5:])
+
+    def test_download_check_unsatisfiable_range(self) -> None:
+        response = self.client.get(self.url, HTTP_RANGE="bytes=1000-")
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+        )
+        self.assertEqual(response["Content-Range"], f"bytes */{len(PDF)}")
+
+    def test_download_check_ignores_multiple_ranges(self) -> None:
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-9,20-29")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(response.streaming_content), PDF)
+        self.assertNotIn("Content-Range", response)
+
+    def test_download_check_with_sendfile_header(self) -> None:
+        with (
+            patch.object(
+                settings, "CHECK_PDF_SENDFILE_HEADER", "X-Accel-Redirect"
+            ),
+            patch.object(
+                settings, "CHECK_PDF_SENDFILE_PREFIX", "/protected-media/"
+            ),
+        ):
+            response = self.client.get(self.url, HTTP_RANGE="bytes=0-7")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(
+            response["X-Accel-Redirect"], "/protected-media/pdf/101_client.pdf"
+        )
+
+    def test_download_check_from_remote_storage(self) -> None:
+        storage = Check._meta.get_field("pdf_file").storage
+
+        with (
+            patch.object(storage, "exists", return_value=True),
+            patch.object(storage, "path", side_effect=NotImplementedError),
+            patch.object(
+                storage, "url", return_value="https://s3.local/101_client.pdf"
+            ),
+        ):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertEqual(
+            response["Location"], "https://s3.local/101_client.pdf"
+        )
+
+    def test_download_missing_check(self) -> None:
+        url = reverse(
+            "check_service:download-check", kwargs={"check_id": 1000}
+        )
+        response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_checks(self) -> None:
+        Check.objects.create(
+            printer_id=self.check.printer_id,
+            check_type="client",
+            order={"order_id": 102, "point_id": 1, "dishes": []},
+            status=Check.StatusChoices.RENDERED,
+            pdf_file="pdf/101_client.pdf",
+        )
+        url = reverse("check_service:check-export")
+        response = self.client.get(url, {"point_id": 1})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/zip")
+
+        archive = zipfile.ZipFile(
+            io.BytesIO(b"".join(response.streaming_content))
+        )
+        self.assertEqual(
+            archive.namelist(),
+            [f"{self.check.printer_id.id}/101_client.pdf"],
+        )
+        self.assertEqual(archive.read(archive.namelist()[0]), PDF)
+
+    def test_export_checks_filters(self) -> None:
+        url = reverse("check_service:check-export")
+        response = self.client.get(url, {"order_id_from": 102})
+        archive = zipfile.ZipFile(
+            io.BytesIO(b"".join(response.streaming_content))
+        )
+
+        self.assertEqual(archive.namelist(), [])
+
+        response = self.client.get(url, {"printer_id": "first"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_download_check_document(self) -> None:
+        document = b"<p>Check for order 101</p>"
+        Printer.objects.filter(id=self.check.printer_id.id).update(
+            output_format="html"
+        )
+        Check.objects.filter(id=self.check.id).update(
+            document_gz=compress(document)
+        )
+
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response.content, compress(document))
+        self.assertEqual(response["Content-Type"], "text/html; charset=utf-8")
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertEqual(response.content, document)
+
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response["ETag"]
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
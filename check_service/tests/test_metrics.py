@@ -0,0 +1,74 @@
+from django.test import TestCase
+from django.urls import resolve, reverse
+from prometheus_client import REGISTRY
+from rest_framework.test import APIClient
+
+from check_service.models import Printer, Check
+
+METRICS_URL = reverse("metrics")
+
+
+class MetricsTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        self.printer = Printer.objects.create(
+            name="HP ScanJet Pro 2000",
+            api_key="bcc65a51-953c-4538-8c84-662868ab4edc",
+            check_type="client",
+            point_id=1,
+        )
+
+    def sample(self, name: str, **labels: str) -> float:
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_print_polls_are_counted(self) -> None:
+        url = reverse(
+            "check_service:check-print-checks",
+            kwargs={"api_key": self.printer.api_key},
+        )
+        empty = self.sample("check_service_print_polls_total", result="empty")
+        requests = self.sample(
+            "check_service_request_duration_seconds_count",
+            method="GET",
+            endpoint=resolve(url).view_name,
+            status="404",
+        )
+
+        self.client.get(url)
+
+        self.assertEqual(
+            self.sample("check_service_print_polls_total", result="empty"),
+            empty + 1,
+        )
+        self.assertEqual(
+            self.sample(
+                "check_service_request_duration_seconds_count",
+                method="GET",
+                endpoint=resolve(url).view_name,
+                status="404",
+            ),
+            requests + 1,
+        )
+
+    def test_metrics_endpoint_reports_queue_depth(self) -> None:
+        for order_id in (101, 102):
+            Check.objects.create(
+                printer_id=self.printer,
+                check_type=self.printer.check_type,
+                order={"order_id": order_id, "point_id": 1, "dishes": []},
+            )
+
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            f'check_service_queue_depth{{printer_id="{self.printer.id}",'
+            f'status="new"}} 2.0',
+            response.content.decode(),
+        )
+        self.assertIn(
+            "check_service_outbox_jobs 0.0", response.content.decode()
+        )
+        self.assertIn(
+            "check_service_pdf_bytes_served_total", response.content.decode()
+        )
@@ -1,8 +1,9 @@
 import json
+from decimal import Decimal
 
 from django.test import TestCase
 
-from check_service.models import Printer, Check
+from check_service.models import Printer, Check, CheckOrder
 
 
 class ModelsTests(TestCase):
@@ -56,3 +57,70 @@ class ModelsTests(TestCase):
             str(check),
             f"Printer id: {printer}. Check type: {check.check_type}. Status: {check.status}.",
         )
+
+    def test_check_save_copies_order_id(self) -> None:
+        printer = Printer.objects.create(
+            name="HP ScanJet Pro 2000",
+            api_key="bcc65a51-953c-4538-8c84-662868ab4edc",
+            check_type="client",
+            point_id=1,
+        )
+        check = Check.objects.create(
+            printer_id=printer,
+            check_type=printer.check_type,
+            order={"order_id": 101, "point_id": 1, "dishes": []},
+        )
+
+        self.assertEqual(check.order_id, 101)
+
+        check.order = {**check.order, "order_id": 102}
+        check.save()
+        check.refresh_from_db()
+
+        self.assertEqual(check.order_id, 102)
+
+    def test_check_for_printer_precomputes_rows(self) -> None:
+        printer = Printer.objects.create(
+            name="HP ScanJet Pro 2000",
+            api_key="bcc65a51-953c-4538-8c84-662868ab4edc",
+            check_type="client",
+            point_id=1,
+        )
+        order = {
+            "order_id": 101,
+            "point_id": 1,
+            "dishes": [
+                {
+                    "name": "Pizza",
+                    "amount": 2,
+                    "price_one_dish": 5.7,
+                    "total_price": 11.4,
+                },
+                {
+                    "name": "Burger",
+                    "amount": 2,
+                    "price_one_dish": 4.5,
+                    "total_price": 9,
+                },
+            ],
+        }
+
+        check = Check.for_printer(printer, order)
+
+        self.assertEqual(check.order_id, 101)
+        self.assertEqual(check.check_type, printer.check_type)
+        self.assertEqual(check.total_amount_due, Decimal("20.40"))
+        self.assertEqual(
+            check.dish_rows,
+            [["Pizza", 2, "5.70", "11.40"], ["Burger", 2, "4.50", "9.00"]],
+        )
+
+
+class FixturesTests(TestCase):
+    fixtures = ["printer_data.json", "check_data.json"]
+
+    def test_fixture_orders_are_registered(self) -> None:
+        self.assertEqual(
+            set(CheckOrder.objects.values_list("order_id", flat=True)),
+            set(Check.objects.values_list("order_id", flat=True)),
+        )
@@ -0,0 +1,83 @@
+from unittest.mock import MagicMock, patch
+
+import redis
+
+from django.test import SimpleTestCase
+
+from check_service.notifications import notify_printers, subscribe
+
+
+class NotificationsTests(SimpleTestCase):
+    def test_notify_printers_publishes_once_per_printer(self) -> None:
+        client = MagicMock()
+        pipeline = client.pipeline.return_value.__enter__.return_value
+
+        with patch(
+            "check_service.notifications.get_redis", return_value=client
+        ):
+            notify_printers([1, 2, 1])
+
+        self.assertEqual(
+            sorted(call.args[0] for call in pipeline.publish.call_args_list),
+            ["check_service:printer:1", "check_service:printer:2"],
+        )
+        pipeline.execute.assert_called_once()
+
+    def test_notify_printers_logs_redis_error(self) -> None:
+        client = MagicMock()
+        pipeline = client.pipeline.return_value.__enter__.return_value
+        pipeline.execute.side_effect = redis.ConnectionError()
+
+        with (
+            patch(
+                "check_service.notifications.get_redis", return_value=client
+            ),
+            self.assertLogs("check_service.notifications", "ERROR"),
+        ):
+            notify_printers([1])
+
+    def test_subscribe_without_redis_polls(self) -> None:
+        with (
+            patch("check_service.notifications.get_redis", return_value=None),
+            patch("check_service.notifications.time.sleep") as mock_sleep,
+            subscribe(1) as wait_for_checks,
+        ):
+            self.assertTrue(wait_for_checks(0.5))
+
+        mock_sleep.assert_called_once_with(0.5)
+
+    def test_subscribe_polls_when_redis_fails(self) -> None:
+        client = MagicMock()
+        pubsub = client.pubsub.return_value
+
+        for failing_call in (pubsub.subscribe, pubsub.get_message):
+            failing_call.side_effect = redis.ConnectionError()
+
+            with (
+                patch(
+                    "check_service.notifications.get_redis",
+                    return_value=client,
+                ),
+                patch("check_service.notifications.time.sleep") as mock_sleep,
+                self.assertLogs("check_service.notifications", "ERROR"),
+                subscribe(1) as wait_for_checks,
+            ):
+                self.assertTrue(wait_for_checks(0.5))
+
+            mock_sleep.assert_called_once_with(0.5)
+
+    def test_subscribe_waits_for_message(self) -> None:
+        client = MagicMock()
+        pubsub = client.pubsub.return_value
+        pubsub.get_message.side_effect = [None, {"data": b"rendered"}]
+
+        with (
+            patch(
+                "check_service.notifications.get_redis", return_value=client
+            ),
+            subscribe(1) as wait_for_checks,
+        ):
+            self.assertTrue(wait_for_checks(5))
+
+        pubsub.subscribe.assert_called_once_with("check_service:printer:1")
+        pubsub.close.assert_called_once()
@@ -0,0 +1,131 @@
+from unittest.mock import patch
+
+from django.db import DatabaseError
+from django.test import TestCase
+from django.urls import reverse
+from kombu.exceptions import OperationalError
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from check_generation_service import settings
+from check_service.models import Printer, Check, RenderJob
+from check_service.outbox import relay_render_jobs
+
+CHECK_BULK_URL = reverse("check_service:check-bulk")
+ORDER_CREATE_URL = reverse("check_service:order-create")
+
+
+class RenderOutboxTests(TestCase):
+    def setUp(self) -> None:
+        self.client = APIClient()
+        for check_type in ("client", "kitchen"):
+            Printer.objects.create(
+                name=f"HP ScanJet Pro {check_type}",
+                api_key=f"printer-{check_type}",
+                check_type=check_type,
+                point_id=1,
+            )
+
+        patcher = patch.object(settings, "CHECK_RENDER_OUTBOX", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_checks(self, *order_ids: int) -> None:
+        with (
+            patch(
+                "check_service.tasks.generate_pdf.apply_async"
+            ) as mock_generate_pdf,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            response = self.client.post(
+                CHECK_BULK_URL,
+                [
+                    {"order_id": order_id, "point_id": 1, "dishes": []}
+                    for order_id in order_ids
+                ],
+                format="json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        mock_generate_pdf.assert_not_called()
+
+    def test_checks_are_created_with_render_jobs(self) -> None:
+        self.create_checks(101, 102)
+
+        self.assertCountEqual(
+            RenderJob.objects.values_list("check_ids", "check_type"),
+            [
+                (
+                    list(
+                        Check.objects.filter(check_type=check_type)
+                        .order_by("id")
+                        .values_list("id", flat=True)
+                    ),
+                    check_type,
+                )
+                for check_type in ("client", "kitchen")
+            ],
+        )
+
+    async def test_async_checks_are_not_saved_without_render_jobs(
+        self,
+    ) -> None:
+        with (
+            patch.object(
+                RenderJob.objects,
+                "bulk_create",
+                side_effect=DatabaseError("The outbox is not available."),
+            ),
+            self.assertRaises(DatabaseError),
+        ):
+            await self.async_client.post(
+                ORDER_CREATE_URL,
+                {"order": {"order_id": 101, "point_id": 1, "dishes": []}},
+                content_type="application/json",
+            )
+
+        self.assertFalse(await Check.objects.filter(order_id=101).aexists())
+
+    def test_relay_publishes_merged_jobs(self) -> None:
+        self.create_checks(101)
+        self.create_checks(102, 103)
+
+        with (
+            patch.object(settings, "CHECK_PDF_BATCH_SIZE", 2),
+            patch(
+                "check_service.outbox.generate_pdf.apply_async"
+            ) as mock_generate_pdf,
+        ):
+            stats = relay_render_jobs(batch_size=10)
+
+        self.assertEqual(stats, {"jobs": 4, "tasks": 4})
+        self.assertFalse(RenderJob.objects.exists())
+        for check_type in ("client", "kitchen"):
+            check_ids = list(
+                Check.objects.filter(check_type=check_type)
+                .order_by("order_id")
+                .values_list("id", flat=True)
+            )
+            self.assertEqual(
+                [
+                    task_call.args
+                    for task_call in mock_generate_pdf.call_args_list
+                    if task_call.args[1]["check_type"] == check_type
+                ],
+                [
+                    ((check_ids[:2],), {"check_type": check_type}),
+                    ((check_ids[2:],), {"check_type": check_type}),
+                ],
+            )
+
+    def test_relay_keeps_jobs_when_broker_fails(self) -> None:
+        self.create_checks(101)
+
+        with patch(
+            "check_service.outbox.generate_pdf.apply_async",
+            side_effect=OperationalError("Connection refused"),
+        ):
+            with self.assertRaises(OperationalError):
+                relay_render_jobs(batch_size=10)
+
+        self.assertEqual(RenderJob.objects.count(), 2)
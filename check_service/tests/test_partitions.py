@@ -0,0 +1,121 @@
+from datetime import date, timedelta
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from check_generation_service import settings
+from check_service import partitions
+from check_service.models import Printer, Check
+
+
+@skipUnless(
+    connection.vendor == "postgresql",
+    "The check table is partitioned only on PostgreSQL.",
+)
+class PartitionsTests(TestCase):
+    def setUp(self) -> None:
+        self.printer = Printer.objects.create(
+            name="HP ScanJet Pro 2000",
+            api_key="bcc65a51-953c-4538-8c84-662868ab4edc",
+            check_type="client",
+            point_id=1,
+        )
+        self.today = timezone.now().date()
+
+    def create_check(self, order_id: int) -> Check:
+        return Check.objects.create(
+            printer_id=self.printer,
+            check_type=self.printer.check_type,
+            order={"order_id": order_id, "point_id": 1, "dishes": []},
+        )
+
+    def test_month_start(self) -> None:
+        self.assertEqual(
+            partitions.month_start(date(2023, 11, 15), 2), date(2024, 1, 1)
+        )
+        self.assertEqual(
+            partitions.month_start(date(2023, 1, 31), -1), date(2022, 12, 1)
+        )
+
+    def test_partition_check_table(self) -> None:
+        if partitions.is_partitioned():
+            self.skipTest("The check table is partitioned by the migrations.")
+
+        old_check = self.create_check(101)
+
+        partitions.partition_check_table(self.today)
+        created = partitions.create_partitions(self.today, 2)
+
+        self.assertTrue(partitions.is_partitioned())
+        self.assertEqual(
+            created,
+            [
+                partitions.partition_name(
+                    partitions.month_start(self.today, offset)
+                )
+                for offset in (1, 2)
+            ],
+        )
+        self.assertEqual(partitions.create_partitions(self.today, 2), [])
+
+        new_check = self.create_check(102)
+        self.assertGreater(new_check.id, old_check.id)
+        Check.objects.filter(id=new_check.id).update(
+            created_at=timezone.now() + timedelta(days=32)
+        )
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.create_check(101)
+
+        detached = partitions.detach_partitions(
+            partitions.month_start(self.today, 1)
+        )
+
+        self.assertEqual(detached, [partitions.LEGACY_TABLE])
+        self.assertEqual(
+            list(Check.objects.values_list("id", flat=True)), [new_check.id]
+        )
+
+    def test_order_is_unique_across_partitions(self) -> None:
+        if not partitions.is_partitioned():
+            partitions.partition_check_table(self.today)
+        partitions.create_partitions(self.today, 2)
+        payload = {"order": {"order_id": 101, "point_id": 1, "dishes": []}}
+
+        with patch("check_service.tasks.generate_pdf.apply_async"):
+            response = self.client.post(
+                reverse("check_service:check-list"),
+                payload,
+                content_type="application/json",
+            )
+            # The checks of the order are moved to the next month partition.
+            Check.objects.filter(order_id=101).update(
+                created_at=timezone.now() + timedelta(days=32)
+            )
+            second_response = self.client.post(
+                reverse("check_service:check-list"),
+                payload,
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            second_response.status_code, status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(Check.objects.filter(order_id=101).count(), 1)
+
+    def test_recent_checks(self) -> None:
+        check = self.create_check(101)
+        Check.objects.filter(id=check.id).update(
+            created_at=timezone.now() - timedelta(days=10)
+        )
+
+        self.assertEqual(Check.objects.recent().count(), 1)
+
+        with patch.object(settings, "CHECK_ACTIVE_DAYS", 7):
+            self.assertEqual(Check.objects.recent().count(), 0)
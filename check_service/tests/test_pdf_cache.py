@@ -0,0 +1,75 @@
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from check_service.pdf_cache import PdfCache
+
+
+class PdfCacheTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = Path(self.directory.name)
+        self.cache = PdfCache(self.root / "cache", max_size=10)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write_pdf(self, name: str, content: bytes) -> Path:
+        path = self.root / name
+        path.write_bytes(content)
+        return path
+
+    def test_get_returns_cached_file(self) -> None:
+        key = PdfCache.key("<p>check</p>")
+
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, self.write_pdf("101_client.pdf", b"%PDF"))
+        cached_path, pdf = self.cache.get(key)
+
+        self.assertEqual(cached_path, self.cache.path(key))
+        self.assertEqual(pdf, b"%PDF")
+
+    def test_link_shares_cached_file(self) -> None:
+        key = PdfCache.key("<p>check</p>")
+        self.cache.put(key, self.write_pdf("101_client.pdf", b"%PDF"))
+        destination = self.root / "102_client.pdf"
+
+        PdfCache.link(self.cache.path(key), destination)
+
+        self.assertEqual(destination.read_bytes(), b"%PDF")
+        self.assertEqual(os.stat(destination).st_nlink, 3)
+
+    def test_concurrent_links_to_same_destination(self) -> None:
+        source = self.write_pdf("101_client.pdf", b"%PDF")
+        destination = self.root / "102_client.pdf"
+
+        with ThreadPoolExecutor(8) as pool:
+            list(
+                pool.map(
+                    lambda _: PdfCache.link(source, destination), range(50)
+                )
+            )
+
+        self.assertEqual(
+            sorted(path.name for path in self.root.iterdir()),
+            ["101_client.pdf", "102_client.pdf"],
+        )
+
+    def test_evict_least_recently_used_files(self) -> None:
+        keys = [PdfCache.key(str(number)) for number in range(3)]
+        for number, key in enumerate(keys[:2]):
+            self.cache.put(key, self.write_pdf(f"{number}.pdf", b"%PDF"))
+            os.utime(self.cache.path(key), (number, number))
+
+        self.cache.get(keys[0])
+        # Another worker process adds a file to the same cache.
+        other_cache = PdfCache(self.root / "cache", max_size=10)
+        other_cache.put(keys[2], self.write_pdf("2.pdf", b"%PDF"))
+        self.cache.evict()
+
+        self.assertTrue(self.cache.path(keys[0]).exists())
+        self.assertFalse(self.cache.path(keys[1]).exists())
+        self.assertTrue(self.cache.path(keys[2]).exists())
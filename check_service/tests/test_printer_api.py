@@ -29,12 +29,12 @@ class PrinterApiTests(TestCase):
 
     def test_list_printers(self) -> None:
         response = self.client.get(PRINTER_LIST_URL)
-        printers = Printer.objects.all()
+        printers = Printer.objects.order_by("id")
         serializer = PrinterSerializer(printers, many=True)
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(response.data, serializer.data)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(response.data["results"], serializer.data)
+        self.assertEqual(len(response.data["results"]), 2)
 
     def test_create_printer(self) -> None:
         payload = {
@@ -0,0 +1,41 @@
+from django.test import TestCase
+
+from check_service.models import Printer
+from check_service.registry import printer_registry
+
+
+class PrinterRegistryTests(TestCase):
+    def setUp(self) -> None:
+        self.printer = Printer.objects.create(
+            name="HP ScanJet Pro 2000",
+            api_key="bcc65a51-953c-4538-8c84-662868ab4edc",
+            check_type="client",
+            point_id=1,
+        )
+
+    def test_printers_are_resolved_without_queries_when_warm(self) -> None:
+        printer_registry.printers_for_point(1)
+
+        with self.assertNumQueries(0):
+            printers = printer_registry.printers_for_point(1)
+            printer = printer_registry.printer_by_api_key(self.printer.api_key)
+
+        self.assertEqual(printers, [self.printer])
+        self.assertEqual(printer, self.printer)
+        self.assertEqual(printer.check_type, self.printer.check_type)
+        self.assertIsNone(printer_registry.printer_by_api_key("unknown"))
+
+    def test_registry_is_invalidated_when_printer_changes(self) -> None:
+        printer_registry.printers_for_point(1)
+
+        self.printer.point_id = 2
+        self.printer.save()
+
+        self.assertEqual(printer_registry.printers_for_point(1), [])
+        self.assertEqual(
+            printer_registry.printers_for_point(2), [self.printer]
+        )
+
+        self.printer.delete()
+
+        self.assertEqual(printer_registry.printers_for_point(2), [])
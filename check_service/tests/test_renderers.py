@@ -0,0 +1,110 @@
+import importlib.util
+import subprocess
+import sys
+from unittest import skipUnless
+from unittest.mock import patch
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase
+
+from check_service.renderers import (
+    RenderError,
+    WeasyPrintRenderer,
+    WkhtmltopdfRenderer,
+    get_renderer,
+)
+
+
+class WkhtmltopdfRendererTests(SimpleTestCase):
+    def test_get_renderer_creates_renderer_once(self) -> None:
+        renderer = get_renderer("check_service.renderers.WkhtmltopdfRenderer")
+
+        self.assertIsInstance(renderer, WkhtmltopdfRenderer)
+        self.assertIs(
+            get_renderer("check_service.renderers.WkhtmltopdfRenderer"),
+            renderer,
+        )
+
+    def test_render_runs_wkhtmltopdf_without_shell(self) -> None:
+        with patch("check_service.renderers.subprocess.run") as mock_run:
+            mock_run.return_value = subprocess.CompletedProcess(
+                args=[], returncode=0, stdout=b"%PDF-1.4"
+            )
+            pdf = WkhtmltopdfRenderer().render("<p>check</p>")
+
+        self.assertEqual(pdf, b"%PDF-1.4")
+        self.assertEqual(mock_run.call_args.args[0][-2:], ["-", "-"])
+        self.assertEqual(mock_run.call_args.kwargs["input"], b"<p>check</p>")
+
+    def test_render_many_returns_pdf_per_page(self) -> None:
+        renderer = WkhtmltopdfRenderer()
+
+        with patch("check_service.renderers.subprocess.run") as mock_run:
+            mock_run.side_effect = lambda command, input, **kwargs: (
+                subprocess.CompletedProcess(
+                    args=command, returncode=0, stdout=b"%PDF " + input
+                )
+            )
+            pdfs = renderer.render_many(["first", "second"])
+
+        self.assertEqual(pdfs, [b"%PDF first", b"%PDF second"])
+
+    def test_render_raises_on_timeout(self) -> None:
+        with patch("check_service.renderers.subprocess.run") as mock_run:
+            mock_run.side_effect = subprocess.TimeoutExpired(
+                cmd="wkhtmltopdf", timeout=30
+            )
+            with self.assertRaisesMessage(RenderError, "timed out after 30"):
+                WkhtmltopdfRenderer().render("<p>check</p>")
+
+        self.assertIn("timeout", mock_run.call_args.kwargs)
+
+    def test_render_many_returns_error_per_failed_page(self) -> None:
+        results = {
+            b"fails": subprocess.CompletedProcess(
+                args=[], returncode=1, stdout=b"", stderr=b"Exit with code 1"
+            ),
+            b"empty": subprocess.CompletedProcess(
+                args=[], returncode=0, stdout=b"", stderr=b""
+            ),
+            b"valid": subprocess.CompletedProcess(
+                args=[], returncode=0, stdout=b"%PDF-1.4", stderr=b""
+            ),
+        }
+
+        with patch("check_service.renderers.subprocess.run") as mock_run:
+            mock_run.side_effect = lambda command, input, **kwargs: results[
+                input
+            ]
+            pdfs = WkhtmltopdfRenderer().render_many(
+                ["fails", "empty", "valid"]
+            )
+
+        self.assertIsInstance(pdfs[0], RenderError)
+        self.assertIn("exited with code 1: Exit with code 1", str(pdfs[0]))
+        self.assertIsInstance(pdfs[1], RenderError)
+        self.assertEqual(pdfs[2], b"%PDF-1.4")
+
+
+class WeasyPrintRendererTests(SimpleTestCase):
+    def test_renderer_requires_weasyprint(self) -> None:
+        with (
+            patch.dict(sys.modules, {"weasyprint": None}),
+            self.assertRaisesMessage(ImproperlyConfigured, "weasyprint"),
+        ):
+            WeasyPrintRenderer()
+
+    @skipUnless(
+        importlib.util.find_spec("weasyprint"),
+        "The weasyprint package is not installed.",
+    )
+    def test_render_many_renders_in_process(self) -> None:
+        with patch("check_service.renderers.subprocess.run") as mock_run:
+            pdfs = WeasyPrintRenderer().render_many(
+                ["<p>first</p>", "<p>second</p>"]
+            )
+
+        self.assertEqual(len(pdfs), 2)
+        for pdf in pdfs:
+            self.assertTrue(pdf.startswith(b"%PDF"))
+        mock_run.assert_not_called()
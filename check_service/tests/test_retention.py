@@ -0,0 +1,121 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.utils import timezone
+
+from check_generation_service import settings
+from check_service.models import Printer, Check, CheckOrder
+from check_service.retention import archive_printed_checks
+
+
+class ArchivePrintedChecksTests(TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.root = Path(self.directory.name)
+        for name, value in (
+            ("MEDIA_ROOT", self.root / "media"),
+            ("CHECK_ARCHIVE_DIR", self.root / "archive"),
+        ):
+            patcher = patch.object(settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.printer = Printer.objects.create(
+            name="HP ScanJet Pro 2000",
+            api_key="bcc65a51-953c-4538-8c84-662868ab4edc",
+            check_type="client",
+            point_id=1,
+        )
+
+    def create_check(
+        self, order_id: int, days: int, status: str = "printed"
+    ) -> Check:
+        pdf_path = self.root / "media" / "pdf" / f"{order_id}_client.pdf"
+        pdf_path.parent.mkdir(parents=True, exist_ok=True)
+        pdf_path.write_bytes(b"%PDF-1.4")
+
+        CheckOrder.objects.get_or_create(order_id=order_id)
+        check = Check.objects.create(
+            printer_id=self.printer,
+            check_type=self.printer.check_type,
+            order={"order_id": order_id, "point_id": 1, "dishes": []},
+            status=status,
+            pdf_file=f"pdf/{order_id}_client.pdf",
+        )
+        Check.objects.filter(id=check.id).update(
+            created_at=timezone.now() - timedelta(days=days)
+        )
+
+        return check
+
+    def test_archive_printed_checks(self) -> None:
+        old_checks = [self.create_check(order_id, 40) for order_id in (1, 2)]
+        self.create_check(3, 40, status="rendered")
+        self.create_check(4, 10)
+
+        stats = archive_printed_checks(days=30, chunk_size=1)
+
+        self.assertEqual(stats["checks"], 2)
+        self.assertEqual(stats["pdf_files"], 2)
+        self.assertEqual(stats["pdf_bytes"], 2 * len(b"%PDF-1.4"))
+        self.assertEqual(
+            sorted(Check.objects.values_list("order_id", flat=True)), [3, 4]
+        )
+        self.assertEqual(
+            sorted(CheckOrder.objects.values_list("order_id", flat=True)),
+            [3, 4],
+        )
+        self.assertFalse(
+            (self.root / "media" / "pdf" / "1_client.pdf").exists()
+        )
+        self.assertTrue(
+            (self.root / "media" / "pdf" / "3_client.pdf").exists()
+        )
+
+        with gzip.open(stats["archive"], "rt") as archive:
+            records = [json.loads(line) for line in archive]
+
+        self.assertEqual(
+            [record["id"] for record in records],
+            [check.id for check in old_checks],
+        )
+        self.assertEqual(records[0]["order"], old_checks[0].order)
+
+    def test_archive_counts_only_freed_pdf_bytes(self) -> None:
+        for order_id in (1, 2):
+            self.create_check(order_id, 40)
+        cached_path = self.root / "pdf_cache" / "1.pdf"
+        cached_path.parent.mkdir()
+        os.link(self.root / "media" / "pdf" / "1_client.pdf", cached_path)
+
+        stats = archive_printed_checks(days=30, chunk_size=10)
+
+        self.assertEqual(stats["pdf_files"], 2)
+        self.assertEqual(stats["pdf_bytes"], len(b"%PDF-1.4"))
+        self.assertTrue(cached_path.exists())
+
+    def test_archive_keeps_shared_pdf_file(self) -> None:
+        self.create_check(1, 40)
+        self.printer = Printer.objects.create(
+            name="HP ScanJet Pro 3000",
+            api_key="6f65be59-89fe-4c7e-be12-c0b30945aee7",
+            check_type="client",
+            point_id=1,
+        )
+        self.create_check(1, 10)
+
+        stats = archive_printed_checks(days=30, chunk_size=10)
+
+        self.assertEqual(stats["checks"], 1)
+        self.assertEqual(stats["pdf_files"], 0)
+        self.assertTrue(CheckOrder.objects.filter(order_id=1).exists())
+        self.assertTrue(
+            (self.root / "media" / "pdf" / "1_client.pdf").exists()
+        )
@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from check_generation_service import settings
+from check_generation_service.celery import app, route_rendering
+from check_service.models import Printer, Check
+from check_service.scheduling import (
+    fair_check_ids,
+    point_backlogs,
+    render_priority,
+)
+
+
+class SchedulingTests(TestCase):
+    def setUp(self) -> None:
+        self.printers = {
+            (point_id, check_type): Printer.objects.create(
+                name=f"HP ScanJet Pro {point_id} {check_type}",
+                api_key=f"printer-{point_id}-{check_type}",
+                check_type=check_type,
+                point_id=point_id,
+            )
+            for point_id in (1, 2)
+            for check_type in ("client", "kitchen")
+        }
+
+    def create_check(
+        self, point_id: int, check_type: str, order_id: int
+    ) -> Check:
+        return Check.objects.create(
+            printer_id=self.printers[point_id, check_type],
+            check_type=check_type,
+            order={"order_id": order_id, "point_id": point_id, "dishes": []},
+        )
+
+    def test_rendering_is_routed_by_check_type(self) -> None:
+        route = app.amqp.router.route(
+            {}, "check_service.tasks.generate_pdf", ([1],), {}
+        )
+        self.assertEqual(route["queue"].name, app.conf.task_default_queue)
+
+        for check_type in ("kitchen", "client"):
+            route = app.amqp.router.route(
+                {},
+                "check_service.tasks.generate_pdf",
+                ([1],),
+                {"check_type": check_type},
+            )
+            self.assertEqual(route["queue"].name, check_type)
+
+        self.assertIsNone(
+            route_rendering(
+                "check_service.tasks.generate_pending_pdfs", (), {}, {}
+            )
+        )
+
+    def test_busy_point_gets_lower_priority(self) -> None:
+        for order_id in range(1, 6):
+            self.create_check(1, "client", order_id)
+        self.create_check(2, "client", 6)
+
+        with patch.object(settings, "CHECK_PDF_POINT_SHARE", 2):
+            backlogs = point_backlogs(
+                [printer.id for printer in self.printers.values()]
+            )
+
+            self.assertEqual(backlogs, {1: 5, 2: 1})
+            self.assertEqual(render_priority(backlogs[1]), 2)
+            self.assertEqual(render_priority(backlogs[2]), 0)
+            self.assertEqual(render_priority(100), 9)
+
+    def test_fair_check_ids_take_points_in_turns(self) -> None:
+        busy_checks = [
+            self.create_check(1, check_type, order_id)
+            for order_id in range(1, 4)
+            for check_type in ("client", "kitchen")
+        ]
+        quiet_check = self.create_check(2, "client", 4)
+
+        self.assertEqual(
+            fair_check_ids(3),
+            [busy_checks[0].id, quiet_check.id, busy_checks[1].id],
+        )
@@ -0,0 +1,68 @@
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from check_generation_service import settings
+from check_service.storage import PdfFileSystemStorage, pdf_upload_to
+
+
+class PdfStorageTests(SimpleTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        media_root_patcher = patch.object(
+            settings, "MEDIA_ROOT", Path(self.directory.name)
+        )
+        media_root_patcher.start()
+        self.addCleanup(media_root_patcher.stop)
+
+        self.storage = PdfFileSystemStorage()
+
+    def test_pdf_upload_to_shards_directories(self) -> None:
+        name = pdf_upload_to(None, "101_client.pdf")
+
+        self.assertRegex(
+            name, r"^pdf/[0-9a-f]{2}/[0-9a-f]{2}/101_client\.pdf$"
+        )
+        self.assertEqual(name, pdf_upload_to(None, "101_client.pdf"))
+        self.assertNotEqual(
+            Path(name).parent,
+            Path(pdf_upload_to(None, "102_client.pdf")).parent,
+        )
+
+    def test_save_replaces_existing_file(self) -> None:
+        name = pdf_upload_to(None, "101_client.pdf")
+
+        self.assertEqual(self.storage.save(name, ContentFile(b"%PDF-1")), name)
+        self.assertEqual(self.storage.save(name, ContentFile(b"%PDF-2")), name)
+
+        path = Path(self.directory.name) / name
+        self.assertEqual(path.read_bytes(), b"%PDF-2")
+        self.assertEqual(list(path.parent.iterdir()), [path])
+
+    def test_failed_save_leaves_no_partial_file(self) -> None:
+        name = pdf_upload_to(None, "101_client.pdf")
+        content = ContentFile(b"%PDF-1")
+
+        with (
+            patch.object(content, "chunks", side_effect=OSError),
+            self.assertRaises(OSError),
+        ):
+            self.storage.save(name, content)
+
+        self.assertFalse(self.storage.exists(name))
+        self.assertEqual(
+            list((Path(self.directory.name) / name).parent.iterdir()), []
+        )
+
+    def test_link_shares_file(self) -> None:
+        source = Path(self.directory.name) / "source.pdf"
+        source.write_bytes(b"%PDF")
+        name = pdf_upload_to(None, "101_client.pdf")
+
+        self.assertEqual(self.storage.link(source, name), name)
+        self.assertEqual(self.storage.open(name).read(), b"%PDF")
+        self.assertEqual(source.stat().st_nlink, 2)
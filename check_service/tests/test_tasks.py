@@ -0,0 +1,408 @@
+import hashlib
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from celery import Task
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase
+from django.utils import timezone
+from prometheus_client import REGISTRY
+
+from check_generation_service import settings
+from check_service.dedup import acquire_render_locks
+from check_service.documents import compress
+from check_service.models import Printer, Check
+from check_service.pdf_cache import PdfCache
+from check_service.renderers import RenderError
+from check_service.scheduling import LOWEST_PRIORITY
+from check_service.storage import pdf_upload_to
+from check_service.tasks import (
+    claim_timeout,
+    generate_pdf,
+    generate_pending_pdfs,
+)
+
+
+class GeneratePdfTaskTests(TestCase):
+    def setUp(self) -> None:
+        self.printer = Printer.objects.create(
+            name="HP ScanJet Pro 2000",
+            api_key="bcc65a51-953c-4538-8c84-662868ab4edc",
+            check_type="kitchen",
+            point_id=1,
+        )
+        self.order = {
+            "order_id": 101,
+            "client_name": "Maria Hernandez",
+            "point_id": 1,
+            "dishes": [
+                {
+                    "name": "Pizza",
+                    "amount": 2,
+                    "price_one_dish": 5.7,
+                    "total_price": 11.4,
+                },
+            ],
+        }
+
+        self.pdf_files = {}
+
+    def create_check(self, order_id: int = 101, **kwargs: Any) -> Check:
+        return Check.objects.create(
+            printer_id=self.printer,
+            check_type=self.printer.check_type,
+            order={**self.order, "order_id": order_id},
+            **kwargs,
+        )
+
+    def run_task(self, task: Task, *args: Any) -> list[int]:
+        """
+        The method runs the task with a fake renderer
+        & returns the sizes of the rendered batches.
+        """
+        with (
+            tempfile.TemporaryDirectory() as media_root,
+            patch.object(settings, "MEDIA_ROOT", media_root),
+            patch("check_service.tasks.get_renderer") as mock_get_renderer,
+            patch(
+                "check_service.tasks.pdf_cache",
+                PdfCache(Path(media_root) / "pdf_cache", max_size=1024),
+            ),
+        ):
+            renderer = mock_get_renderer.return_value
+            self.renderer = renderer
+            renderer.render_many.side_effect = lambda htmls: [
+                RenderError("Exit with code 1")
+                if "Poison" in html
+                else b"%PDF-1.4"
+                for html in htmls
+            ]
+            self.stats = task(*args)
+            for check in Check.objects.exclude(pdf_file=""):
+                path = Path(media_root) / check.pdf_file.name
+                if path.exists():
+                    self.pdf_files[check.id] = path.read_bytes()
+
+        return [
+            len(call.args[0]) for call in renderer.render_many.call_args_list
+        ]
+
+    def rendered_htmls(self) -> list[str]:
+        return [
+            html
+            for call in self.renderer.render_many.call_args_list
+            for html in call.args[0]
+        ]
+
+    def test_generate_pdf_renders_only_given_new_checks(self) -> None:
+        new_check = self.create_check(101)
+        other_check = self.create_check(102)
+        rendered_check = self.create_check(
+            103, status=Check.StatusChoices.RENDERED
+        )
+
+        batches = self.run_task(
+            generate_pdf, [new_check.id, rendered_check.id]
+        )
+
+        self.assertEqual(batches, [1])
+        new_check.refresh_from_db()
+        other_check.refresh_from_db()
+        self.assertEqual(new_check.status, Check.StatusChoices.RENDERED)
+        self.assertEqual(
+            new_check.pdf_file.name,
+            pdf_upload_to(new_check, "101_kitchen.pdf"),
+        )
+        self.assertEqual(
+            new_check.pdf_sha256, hashlib.sha256(b"%PDF-1.4").hexdigest()
+        )
+        self.assertEqual(other_check.status, Check.StatusChoices.NEW)
+
+    def test_generate_pending_pdfs_renders_new_checks_in_batches(self) -> None:
+        checks = [self.create_check(order_id) for order_id in range(1, 6)]
+        rendered_check = self.create_check(
+            6, status=Check.StatusChoices.RENDERED
+        )
+
+        with patch.object(settings, "CHECK_PDF_BATCH_SIZE", 2):
+            batches = self.run_task(generate_pending_pdfs)
+
+        self.assertEqual(batches, [2, 2, 1])
+        self.assertEqual(
+            Check.objects.filter(
+                id__in=[check.id for check in checks],
+                status=Check.StatusChoices.RENDERED,
+            ).count(),
+            5,
+        )
+        rendered_check.refresh_from_db()
+        self.assertFalse(rendered_check.pdf_file)
+
+    def test_generate_pdf_reuses_cached_pdf_for_identical_check(self) -> None:
+        first_check = self.create_check()
+        self.printer = Printer.objects.create(
+            name="HP ScanJet Pro 3000",
+            api_key="6f65be59-89fe-4c7e-be12-c0b30945aee7",
+            check_type="kitchen",
+            point_id=1,
+        )
+        second_check = self.create_check()
+
+        with patch.object(settings, "CHECK_PDF_BATCH_SIZE", 1):
+            batches = self.run_task(generate_pending_pdfs)
+
+        self.assertEqual(batches, [1])
+        self.assertEqual(self.pdf_files[first_check.id], b"%PDF-1.4")
+        self.assertEqual(self.pdf_files[second_check.id], b"%PDF-1.4")
+
+    def test_generate_pdf_copies_cached_pdf_evicted_after_lookup(
+        self,
+    ) -> None:
+        check = self.create_check()
+        hits = REGISTRY.get_sample_value(
+            "check_service_pdf_cache_lookups_total", {"result": "hit"}
+        )
+
+        def evicted_entry(cache: PdfCache, key: str) -> tuple[Path, bytes]:
+            # Another process evicts the file right after it is read.
+            return cache.path(key), b"%PDF-1.4"
+
+        with patch.object(PdfCache, "get", evicted_entry):
+            batches = self.run_task(generate_pdf, [check.id])
+
+        self.assertEqual(batches, [])
+        self.assertEqual(self.pdf_files[check.id], b"%PDF-1.4")
+        self.assertEqual(
+            REGISTRY.get_sample_value(
+                "check_service_pdf_cache_lookups_total", {"result": "hit"}
+            ),
+            (hits or 0) + 1,
+        )
+
+    def test_generate_pdf_renders_precomputed_rows(self) -> None:
+        check = self.create_check()
+        legacy_check = self.create_check(102)
+        Check.objects.filter(id=legacy_check.id).update(
+            total_amount_due=None, dish_rows=[]
+        )
+
+        self.run_task(generate_pdf, [check.id, legacy_check.id])
+
+        self.assertEqual(self.stats["checks"], 2)
+        for html in self.rendered_htmls():
+            self.assertIn("<td>Pizza</td>", html)
+            self.assertIn("<td>5.70</td>", html)
+            self.assertIn("Total amount due: 11.40 USD", html)
+
+    def test_generate_pdf_converts_html_rendered_at_ingestion(self) -> None:
+        check = self.create_check(
+            document_gz=compress(b"<p>Rendered at ingestion</p>")
+        )
+
+        self.run_task(generate_pdf, [check.id])
+
+        self.assertEqual(
+            self.rendered_htmls(), ["<p>Rendered at ingestion</p>"]
+        )
+        check.refresh_from_db()
+        self.assertEqual(check.status, Check.StatusChoices.RENDERED)
+        self.assertIsNone(check.document_gz)
+
+    def test_generate_pdf_drops_check_claimed_by_another_task(self) -> None:
+        check = self.create_check()
+        name = pdf_upload_to(check, "101_kitchen.pdf")
+        claimed_until = timezone.now() + timedelta(minutes=5)
+
+        def take_over(htmls: list[str]) -> list[bytes]:
+            # The claim expires during the render & another task takes it.
+            Check.objects.filter(id=check.id).update(
+                render_after=claimed_until
+            )
+            return [b"%PDF-1.4 late" for _ in htmls]
+
+        def render_elsewhere(htmls: list[str]) -> list[bytes]:
+            # The other task renders the check before this one is done.
+            Check._meta.get_field("pdf_file").storage.save(
+                name, ContentFile(b"%PDF-1.4 other")
+            )
+            Check.objects.filter(id=check.id).update(
+                status=Check.StatusChoices.RENDERED,
+                pdf_file=name,
+                render_after=None,
+            )
+            return [b"%PDF-1.4 late" for _ in htmls]
+
+        with (
+            tempfile.TemporaryDirectory() as media_root,
+            patch.object(settings, "MEDIA_ROOT", media_root),
+            patch("check_service.tasks.pdf_cache.max_size", 0),
+            patch("check_service.tasks.get_renderer") as mock_get_renderer,
+        ):
+            render_many = mock_get_renderer.return_value.render_many
+            render_many.side_effect = take_over
+            stats = generate_pdf([check.id])
+
+            self.assertEqual(list(Path(media_root).rglob("*.*")), [])
+            self.assertEqual(stats["checks"], 0)
+            check.refresh_from_db()
+            self.assertEqual(check.status, Check.StatusChoices.NEW)
+            self.assertEqual(check.render_after, claimed_until)
+
+            Check.objects.filter(id=check.id).update(render_after=None)
+            render_many.side_effect = render_elsewhere
+            stats = generate_pdf([check.id])
+
+            self.assertEqual(stats["checks"], 0)
+            self.assertEqual(
+                [path.name for path in Path(media_root).rglob("*.*")],
+                ["101_kitchen.pdf"],
+            )
+            self.assertEqual(
+                (Path(media_root) / name).read_bytes(), b"%PDF-1.4 other"
+            )
+
+    def test_claim_timeout_covers_batch(self) -> None:
+        with (
+            patch.object(settings, "CHECK_LOCK_TIMEOUT", 60),
+            patch.object(settings, "CHECK_PDF_RENDER_TIMEOUT", 30),
+            patch.object(settings, "CHECK_PDF_RENDER_PROCESSES", 4),
+        ):
+            self.assertEqual(claim_timeout(1), 90)
+            self.assertEqual(claim_timeout(100), 60 + 25 * 30)
+
+    def test_failed_check_does_not_block_other_checks(self) -> None:
+        check = self.create_check(101)
+        self.order["dishes"][0]["name"] = "Poison"
+        poison_check = self.create_check(102)
+
+        with (
+            patch.object(settings, "CHECK_PDF_RETRY_DELAY", 10),
+            patch.object(settings, "CHECK_PDF_RENDER_MAX_ATTEMPTS", 2),
+            patch("check_service.tasks.generate_pdf.apply_async") as retry,
+        ):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.run_task(generate_pdf, [check.id, poison_check.id])
+
+            poison_check.refresh_from_db()
+            self.assertEqual(self.stats["checks"], 1)
+            self.assertEqual(self.stats["failed"], 1)
+            self.assertEqual(poison_check.status, Check.StatusChoices.NEW)
+            self.assertEqual(poison_check.render_attempts, 1)
+            self.assertEqual(poison_check.render_error, "Exit with code 1")
+            self.assertIsNotNone(poison_check.render_after)
+            retry.assert_called_once_with(
+                ([poison_check.id],),
+                {"check_type": "kitchen"},
+                countdown=10,
+                priority=LOWEST_PRIORITY,
+            )
+
+            # The retry is delivered once the delay has passed.
+            Check.objects.filter(id=poison_check.id).update(
+                render_after=timezone.now()
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                self.run_task(generate_pdf, [poison_check.id])
+
+        check.refresh_from_db()
+        poison_check.refresh_from_db()
+        self.assertEqual(check.status, Check.StatusChoices.RENDERED)
+        self.assertEqual(poison_check.status, Check.StatusChoices.FAILED)
+        self.assertEqual(poison_check.render_attempts, 2)
+        self.assertEqual(retry.call_count, 1)
+
+    def test_failed_task_counts_attempt_of_its_checks(self) -> None:
+        checks = [self.create_check(order_id) for order_id in (101, 102)]
+
+        with (
+            patch.object(settings, "CHECK_PDF_BATCH_RENDERING", True),
+            patch.object(settings, "CHECK_PDF_RENDER_MAX_ATTEMPTS", 2),
+            patch("check_service.tasks.get_renderer") as mock_get_renderer,
+        ):
+            render_many = mock_get_renderer.return_value.render_many
+            render_many.side_effect = OSError("Too many open files")
+
+            for _ in range(2):
+                # The checks are due again once the retry delay has passed.
+                Check.objects.update(render_after=None)
+                with self.assertRaises(OSError):
+                    generate_pending_pdfs()
+
+        for check in checks:
+            check.refresh_from_db()
+            self.assertEqual(check.status, Check.StatusChoices.FAILED)
+            self.assertEqual(check.render_attempts, 2)
+            self.assertIn("Too many open files", check.render_error)
+
+    def test_failed_task_is_retried_once_per_attempt(self) -> None:
+        check = self.create_check()
+
+        with (
+            patch.object(settings, "CHECK_PDF_RETRY_DELAY", 10),
+            patch("check_service.tasks.get_renderer") as mock_get_renderer,
+            patch("check_service.tasks.generate_pdf.apply_async") as retry,
+            self.captureOnCommitCallbacks(execute=True),
+        ):
+            render_many = mock_get_renderer.return_value.render_many
+            render_many.side_effect = OSError("Too many open files")
+            result = generate_pdf.apply(([check.id],))
+
+        self.assertIsInstance(result.result, OSError)
+        retry.assert_called_once_with(
+            ([check.id],),
+            {"check_type": "kitchen"},
+            countdown=10,
+            priority=LOWEST_PRIORITY,
+        )
+        check.refresh_from_db()
+        self.assertEqual(check.render_attempts, 1)
+
+    def test_generate_pending_pdfs_sweeps_stale_checks(self) -> None:
+        stale_check = self.create_check(101)
+        Check.objects.filter(id=stale_check.id).update(
+            created_at=timezone.now() - timedelta(minutes=5)
+        )
+        new_check = self.create_check(102)
+
+        batches = self.run_task(generate_pending_pdfs, 60)
+
+        self.assertEqual(batches, [1])
+        stale_check.refresh_from_db()
+        new_check.refresh_from_db()
+        self.assertEqual(stale_check.status, Check.StatusChoices.RENDERED)
+        self.assertEqual(new_check.status, Check.StatusChoices.NEW)
+
+    def test_generate_pending_pdfs_skips_checks_waiting_for_retry(
+        self,
+    ) -> None:
+        self.order["dishes"][0]["name"] = "Poison"
+        poison_check = self.create_check(101)
+
+        with patch.object(settings, "CHECK_PDF_BATCH_SIZE", 1):
+            batches = self.run_task(generate_pending_pdfs)
+            self.assertEqual(self.run_task(generate_pending_pdfs), [])
+
+        self.assertEqual(batches, [1])
+        poison_check.refresh_from_db()
+        self.assertEqual(poison_check.render_attempts, 1)
+
+    def test_generate_pdf_skips_checks_locked_by_another_task(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+        check = self.create_check(101)
+        acquire_render_locks([check.id], "another-task")
+
+        with (
+            patch("check_service.tasks.generate_pdf.apply_async") as publish,
+            self.assertNumQueries(0),
+        ):
+            stats = generate_pdf([check.id], "kitchen")
+
+        self.assertEqual(stats["checks"], 0)
+        publish.assert_not_called()
+        check.refresh_from_db()
+        self.assertEqual(check.status, Check.StatusChoices.NEW)
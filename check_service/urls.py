@@ -1,7 +1,12 @@
 from django.urls import include, path
 from rest_framework import routers
 
-from check_service.views import PrinterViewSet, CheckViewSet, download_check
+from check_service.views import (
+    PrinterViewSet,
+    CheckViewSet,
+    create_order_checks,
+    download_check,
+)
 
 router = routers.DefaultRouter()
 router.register("printers", PrinterViewSet)
@@ -9,6 +14,7 @@ router.register("checks", CheckViewSet)
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("orders/", create_order_checks, name="order-create"),
     path(
         "download-checks/<int:check_id>/",
         download_check,
@@ -1,16 +1,234 @@
+import json
+import logging
+import time
+from collections import defaultdict
+from functools import partial
+from pathlib import Path
 from typing import Any
 
-from django.http import FileResponse
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import QuerySet
+from django.http import (
+    HttpRequest,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    HttpResponseRedirect,
+    JsonResponse,
+    QueryDict,
+    StreamingHttpResponse,
+)
+from kombu.exceptions import OperationalError
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.serializers import BaseSerializer
 
 from check_generation_service import settings
-from check_service.models import Printer, Check
-from check_service.serializers import PrinterSerializer, CheckSerializer
+from check_service.dedup import aidempotent, idempotent
+from check_service.documents import CONTENT_TYPES, EXTENSIONS, render_ahead
+from check_service.exports import zip_checks
+from check_service.metrics import PRINT_POLLS
+from check_service.models import Printer, Check, CheckOrder, RenderJob
+from check_service.notifications import notify_printers, subscribe
+from check_service.parsers import NDJSONParser
+from check_service.registry import printer_registry
+from check_service.responses import (
+    document_response,
+    file_sha256,
+    pdf_response,
+)
+from check_service.scheduling import point_backlogs, render_priority
+from check_service.serializers import (
+    PrinterSerializer,
+    CheckSerializer,
+    CheckListSerializer,
+)
 from check_service.tasks import generate_pdf
 
+logger = logging.getLogger(__name__)
+
+
+def claim_checks(printer: Printer) -> list[Check]:
+    """
+    The function marks up to `CHECK_PRINT_BATCH_SIZE` rendered checks
+    of the printer as printed & returns them.
+    """
+    # Locked checks are being claimed by a concurrent poll of the same
+    # printer, so they are skipped instead of being printed twice.
+    with transaction.atomic():
+        checks = list(
+            printer.checks.recent()
+            .select_for_update(skip_locked=True)
+            .filter(status=Check.StatusChoices.RENDERED)
+            .defer("document_gz")
+            .order_by("id")[: settings.CHECK_PRINT_BATCH_SIZE]
+        )
+        Check.objects.filter(id__in=[check.id for check in checks]).update(
+            status=Check.StatusChoices.PRINTED
+        )
+
+    for check in checks:
+        check.status = Check.StatusChoices.PRINTED
+
+    return checks
+
+
+def order_error(order: Any) -> str | None:
+    """
+    The function returns the message of the first problem
+    with the order id & point id of the order, if any.
+    """
+    if not isinstance(order, dict):
+        return "Order is not valid."
+
+    order_id = order.get("order_id")
+    point_id = order.get("point_id")
+
+    if not order_id:
+        return "Order id is missing."
+    if not isinstance(order_id, int):
+        return f"Order id: {order_id} is not valid."
+    if not point_id:
+        return "Point id is missing from the order."
+    if not isinstance(point_id, int):
+        return f"Point id: {point_id} is not valid."
+
+    return None
+
+
+def rendering_tasks(
+    checks: list[Check], backlogs: dict[int, int]
+) -> list[tuple[tuple, dict, int]]:
+    """
+    The function splits the checks into chunks of `CHECK_PDF_BATCH_SIZE`
+    checks & returns the arguments & priority of a rendering task per chunk.
+    The chunks hold checks of one type, so that they are routed to the
+    queue of the type, & of points with the same backlog, so that the
+    busy points get a lower priority.
+    """
+    groups = defaultdict(list)
+    for check in checks:
+        priority = render_priority(backlogs.get(check.printer_id.point_id, 0))
+        groups[check.check_type, priority].append(check.id)
+
+    tasks = []
+    for (check_type, priority), check_ids in groups.items():
+        for start in range(0, len(check_ids), settings.CHECK_PDF_BATCH_SIZE):
+            chunk = check_ids[start : start + settings.CHECK_PDF_BATCH_SIZE]
+            tasks.append(((chunk,), {"check_type": check_type}, priority))
+
+    return tasks
+
+
+def render_jobs(tasks: list[tuple[tuple, dict, int]]) -> list[RenderJob]:
+    return [
+        RenderJob(
+            check_ids=args[0],
+            check_type=kwargs["check_type"],
+            priority=priority,
+        )
+        for args, kwargs, priority in tasks
+    ]
+
+
+def publish_rendering(args: tuple, kwargs: dict, priority: int) -> None:
+    """
+    The function publishes a rendering task of the saved checks. When the
+    broker is not available, the checks are left to the sweep of new
+    checks instead of failing the request that saved them.
+    """
+    try:
+        generate_pdf.apply_async(args, kwargs, priority=priority)
+    except OperationalError:
+        logger.exception(
+            "The rendering of checks %s was not published.", args[0]
+        )
+
+
+def enqueue_rendering(checks: list[Check]) -> None:
+    """
+    The function schedules rendering of the checks once the transaction
+    is committed. With `CHECK_RENDER_OUTBOX`, the rendering jobs are
+    written to the outbox in the transaction instead. The checks rendered
+    at ingestion are announced to their printers.
+    """
+    new_checks = [
+        check
+        for check in checks
+        if check.status != Check.StatusChoices.RENDERED
+    ]
+    if new_checks and not settings.CHECK_PDF_BATCH_RENDERING:
+        backlogs = point_backlogs(
+            list({check.printer_id_id for check in new_checks})
+        )
+        tasks = rendering_tasks(new_checks, backlogs)
+
+        if settings.CHECK_RENDER_OUTBOX:
+            RenderJob.objects.bulk_create(render_jobs(tasks))
+        else:
+            for args, kwargs, priority in tasks:
+                transaction.on_commit(
+                    partial(publish_rendering, args, kwargs, priority)
+                )
+
+    # The printers are notified last, so that the rendering tasks
+    # are published whatever happens to the notifications.
+    printer_ids = [
+        check.printer_id_id
+        for check in checks
+        if check.status == Check.StatusChoices.RENDERED
+    ]
+    if printer_ids:
+        transaction.on_commit(partial(notify_printers, printer_ids))
+
+
+def save_checks(checks: list[Check]) -> None:
+    """
+    The function saves the new checks & schedules their rendering in one
+    transaction, so that no check is saved without its rendering job.
+    It raises `IntegrityError` when the checks of an order exist,
+    at any point & in any partition of the check table.
+    """
+    # The orders are inserted sorted, so that concurrent batches
+    # wait for each other instead of deadlocking.
+    order_ids = sorted({check.order_id for check in checks})
+    with transaction.atomic():
+        CheckOrder.objects.bulk_create(
+            [CheckOrder(order_id=order_id) for order_id in order_ids]
+        )
+        Check.objects.bulk_create(checks)
+        enqueue_rendering(checks)
+
+
+CHECK_FILTERS = {
+    "printer_id__point_id": "point_id",
+    "printer_id": "printer_id",
+    "order_id__gte": "order_id_from",
+    "order_id__lte": "order_id_to",
+}
+
+
+def filter_checks(checks: QuerySet, query_params: QueryDict) -> QuerySet:
+    """
+    The function filters the checks by `point_id`, `printer_id`,
+    `order_id_from` & `order_id_to` query parameters.
+    """
+    for lookup, param in CHECK_FILTERS.items():
+        value = query_params.get(param)
+        if value is None:
+            continue
+
+        if not value.isdigit():
+            raise ValidationError({"message": f"{param} must be an integer."})
+
+        checks = checks.filter(**{lookup: int(value)})
+
+    return checks
+
 
 class PrinterViewSet(viewsets.ModelViewSet):
     queryset = Printer.objects.all()
@@ -21,57 +239,202 @@ class CheckViewSet(viewsets.ModelViewSet):
     queryset = Check.objects.all()
     serializer_class = CheckSerializer
 
+    def get_queryset(self) -> QuerySet:
+        """
+        The method filters the listed checks by `status` & the
+        `filter_checks` query parameters.
+        """
+        queryset = super().get_queryset()
+
+        if self.action == "list":
+            queryset = filter_checks(
+                queryset.select_related("printer_id").defer("document_gz"),
+                self.request.query_params,
+            )
+            if "status" in self.request.query_params:
+                queryset = queryset.filter(
+                    status=self.request.query_params["status"]
+                )
+
+        return queryset
+
+    def get_serializer_class(self) -> type[BaseSerializer]:
+        """
+        The method lists the checks without their orders,
+        unless they are asked for with `include=order`.
+        """
+        if (
+            self.action == "list"
+            and self.request.query_params.get("include") != "order"
+        ):
+            return CheckListSerializer
+
+        return super().get_serializer_class()
+
+    @idempotent
     def create(self, request: Request, *args: Any, **kwargs: Any) -> Response:
         """
-        The method creates new checks.
+        The method creates new checks. A request repeated with the same
+        `Idempotency-Key` header gets the response of the first one.
         """
-        order_id = request.data.get("order", {}).get("order_id")
-        if not order_id:
+        order = request.data.get("order", {})
+        if message := order_error(order):
+            return Response(
+                {"message": message}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        order_id, point_id = order["order_id"], order["point_id"]
+        printers = printer_registry.printers_for_point(point_id)
+        if not printers:
             return Response(
-                {"message": "Order id is missing."},
+                {
+                    "message": f"There are no printers available for point: {point_id}."
+                },
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if Check.objects.filter(order__order_id=order_id).exists():
+        serializer = CheckSerializer(
+            data={"order": request.data.get("order")}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        order = serializer.validated_data["order"]
+
+        checks = [Check.for_printer(printer, order) for printer in printers]
+        render_ahead(checks)
+
+        try:
+            save_checks(checks)
+        except IntegrityError:
             return Response(
                 {"message": f"Checks for order: {order_id} already exist."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        point_id = request.data.get("order", {}).get("point_id")
-        if not point_id:
+        return Response(
+            {"checks": CheckSerializer(checks, many=True).data},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="bulk",
+        url_name="bulk",
+        parser_classes=[JSONParser, NDJSONParser],
+    )
+    def bulk(self, request: Request) -> Response:
+        """
+        The method creates checks for a batch of orders,
+        sent as a JSON array or as a NDJSON stream.
+        """
+        if not isinstance(request.data, list):
             return Response(
-                {"message": "Point id is missing from the order."},
+                {"message": "A list of orders is expected."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        printers = Printer.objects.filter(point_id=point_id)
-        if not printers:
+        results = []
+        orders = {}
+        for item in request.data:
+            order = item.get("order", item) if isinstance(item, dict) else item
+            if not isinstance(order, dict):
+                results.append(
+                    {"status": "invalid", "message": "Order is not valid."}
+                )
+                continue
+
+            order_id = order.get("order_id")
+            result = {"order_id": order_id}
+            results.append(result)
+
+            if message := order_error(order):
+                result["message"] = message
+            elif order_id in orders:
+                result["status"] = "duplicate"
+                result["message"] = f"Order: {order_id} is repeated."
+                continue
+            else:
+                orders[order_id] = (result, order)
+                continue
+
+            result["status"] = "invalid"
+
+        existing_order_ids = set(
+            CheckOrder.objects.filter(order_id__in=list(orders)).values_list(
+                "order_id", flat=True
+            )
+        )
+        checks = []
+        created = []
+        for order_id, (result, order) in orders.items():
+            printers = printer_registry.printers_for_point(order["point_id"])
+
+            if order_id in existing_order_ids:
+                result["status"] = "duplicate"
+                result[
+                    "message"
+                ] = f"Checks for order: {order_id} already exist."
+            elif not printers:
+                result["status"] = "invalid"
+                result["message"] = (
+                    "There are no printers available "
+                    f"for point: {order['point_id']}."
+                )
+            else:
+                order_checks = [
+                    Check.for_printer(printer, order) for printer in printers
+                ]
+                checks.extend(order_checks)
+                created.append((result, order_checks))
+
+        render_ahead(checks)
+
+        try:
+            save_checks(checks)
+        except IntegrityError:
             return Response(
                 {
-                    "message": f"There are no printers available for point: {point_id}."
+                    "message": "Checks for some of the orders were created "
+                    "concurrently, the batch can be safely resent."
                 },
-                status=status.HTTP_400_BAD_REQUEST,
+                status=status.HTTP_409_CONFLICT,
             )
 
-        checks = []
-        for printer in printers:
-            check_data = {
-                "printer_id": printer.id,
-                "check_type": printer.check_type,
-                "order": request.data.get("order"),
-            }
-            serializer = CheckSerializer(data=check_data)
-            serializer.is_valid(raise_exception=True)
-            check = serializer.save()
-            checks.append(check)
-
-            generate_pdf.delay()
+        for result, order_checks in created:
+            result["status"] = "created"
+            result["checks"] = [check.id for check in order_checks]
 
-        return Response(
-            {"checks": CheckSerializer(checks, many=True).data},
-            status=status.HTTP_201_CREATED,
+        return Response({"orders": results})
+
+    @action(
+        detail=False, methods=["get"], url_path="export", url_name="export"
+    )
+    def export(self, request: Request) -> StreamingHttpResponse:
+        """
+        The method streams a ZIP archive with the pdf files of the checks,
+        filtered by `point_id`, `printer_id`, `order_id_from`, `order_id_to`
+        & `status` (`printed` by default).
+        """
+        checks = filter_checks(
+            Check.objects.filter(
+                status=request.query_params.get(
+                    "status", Check.StatusChoices.PRINTED
+                )
+            ),
+            request.query_params,
+        )
+        checks = (
+            checks.exclude(pdf_file="")
+            .only("id", "printer_id", "pdf_file")
+            .order_by("id")
+            .iterator(chunk_size=1000)
+        )
+        response = StreamingHttpResponse(
+            zip_checks(checks), content_type="application/zip"
         )
+        response["Content-Disposition"] = "attachment; filename=checks.zip"
+
+        return response
 
     @action(
         detail=False,
@@ -81,19 +444,46 @@ class CheckViewSet(viewsets.ModelViewSet):
     )
     def print_checks(self, request: Request, api_key: str) -> Response:
         """
-        The method changes check status from `RENDERED` to `PRINTED`.
+        The method changes check status from `RENDERED` to `PRINTED`
+        for up to `CHECK_PRINT_BATCH_SIZE` checks of the printer.
+
+        With the `wait` query parameter, the method waits up to the given
+        number of seconds for the checks to be rendered.
         """
-        try:
-            printer = Printer.objects.get(api_key=api_key)
-        except Printer.DoesNotExist:
+        printer = printer_registry.printer_by_api_key(api_key)
+        if printer is None:
             return Response(
                 {"message": "There are no available printers."},
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        checks = printer.checks.filter(status=Check.StatusChoices.RENDERED)
+        try:
+            wait = min(
+                float(request.query_params.get("wait", 0)),
+                settings.CHECK_LONG_POLL_MAX_WAIT,
+            )
+        except ValueError:
+            return Response(
+                {"message": "Wait must be a number of seconds."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if wait > 0:
+            deadline = time.monotonic() + wait
+
+            with subscribe(printer.id) as wait_for_checks:
+                checks = claim_checks(printer)
+                while (
+                    not checks
+                    and (remaining := deadline - time.monotonic()) > 0
+                ):
+                    if wait_for_checks(remaining):
+                        checks = claim_checks(printer)
+        else:
+            checks = claim_checks(printer)
 
         if not checks:
+            PRINT_POLLS.labels("empty").inc()
             return Response(
                 {
                     "message": f"There are no checks available for the printer: {printer.id}."
@@ -101,21 +491,105 @@ class CheckViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        for check in checks:
-            check.status = Check.StatusChoices.PRINTED
-            check.save()
+        PRINT_POLLS.labels("non_empty").inc()
 
         serializer = self.get_serializer(checks, many=True)
 
         return Response(serializer.data)
 
 
+@aidempotent
+async def create_order_checks(request: HttpRequest) -> HttpResponse:
+    """
+    The view creates the checks of an order like `CheckViewSet.create`,
+    including the replays of the requests with an `Idempotency-Key`,
+    but holds a thread only for the transaction that saves them, so that
+    an ASGI server handles many orders per process.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse(
+            {"message": "The body is not valid JSON."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    order = data.get("order", {}) if isinstance(data, dict) else None
+    if message := order_error(order):
+        return JsonResponse(
+            {"message": message}, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    point_id = order["point_id"]
+    printers = await printer_registry.aprinters_for_point(point_id)
+    if not printers:
+        return JsonResponse(
+            {
+                "message": f"There are no printers available for point: {point_id}."
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    serializer = CheckSerializer(data={"order": order}, partial=True)
+    if not serializer.is_valid():
+        return JsonResponse(
+            serializer.errors, status=status.HTTP_400_BAD_REQUEST
+        )
+
+    order = serializer.validated_data["order"]
+    checks = [Check.for_printer(printer, order) for printer in printers]
+    render_ahead(checks)
+
+    # Django has no async transactions, so the checks & their rendering
+    # jobs are saved in one from a thread.
+    try:
+        await sync_to_async(save_checks)(checks)
+    except IntegrityError:
+        return JsonResponse(
+            {
+                "message": f"Checks for order: {order['order_id']} already exist."
+            },
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    return JsonResponse(
+        {"checks": CheckSerializer(checks, many=True).data},
+        status=status.HTTP_201_CREATED,
+    )
+
+
+# The POS systems post the orders without a CSRF token, like to the DRF views.
+create_order_checks.csrf_exempt = True
+
+
 @api_view(["GET"])
-def download_check(request: Request, check_id: int) -> Response | FileResponse:
+def download_check(request: Request, check_id: int) -> HttpResponse:
     """
     The method returns a printed check from the media root.
     """
-    check = Check.objects.get(id=check_id)
+    check = (
+        Check.objects.filter(id=check_id)
+        .select_related("printer_id")
+        .only(
+            "order_id",
+            "check_type",
+            "status",
+            "pdf_file",
+            "pdf_sha256",
+            "document_gz",
+            "printer_id__output_format",
+        )
+        .first()
+    )
+
+    if check is None:
+        return Response(
+            {"message": f"Check: {check_id} does not exist."},
+            status=status.HTTP_404_NOT_FOUND,
+        )
 
     if check.status != Check.StatusChoices.PRINTED:
         return Response(
@@ -123,16 +597,34 @@ def download_check(request: Request, check_id: int) -> Response | FileResponse:
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    path = f"pdf/{check.order['order_id']}_{check.check_type}.pdf"
-    filepath = settings.MEDIA_ROOT / path
+    output_format = check.printer_id.output_format
+    if check.document_gz and output_format in CONTENT_TYPES:
+        return document_response(
+            request,
+            bytes(check.document_gz),
+            CONTENT_TYPES[output_format],
+            f"{check.order_id}_{check.check_type}.{EXTENSIONS[output_format]}",
+        )
+
+    pdf_file = check.pdf_file
 
-    if not filepath.exists():
+    if not pdf_file or not pdf_file.storage.exists(pdf_file.name):
         return Response(
             {"message": "There is no available check for download."},
             status=status.HTTP_400_BAD_REQUEST,
         )
 
-    response = FileResponse(open(filepath, "rb"))
-    response["Content-Disposition"] = f"inline; filename={filepath.name}"
+    try:
+        filepath = Path(pdf_file.path)
+    except NotImplementedError:
+        # A remote storage serves its files itself.
+        return HttpResponseRedirect(pdf_file.url)
 
-    return response
+    if not check.pdf_sha256:
+        # The digest is kept, so that the file is hashed only once.
+        check.pdf_sha256 = file_sha256(filepath)
+        Check.objects.filter(id=check.id).update(pdf_sha256=check.pdf_sha256)
+
+    return pdf_response(
+        request, filepath, pdf_file.name, f'"{check.pdf_sha256}"'
+    )